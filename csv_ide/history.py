@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Union
+
+from PyQt6 import QtCore
+
+if TYPE_CHECKING:
+    from csv_ide.models import CSVTableModel
+
+
+@dataclass
+class CellEdit:
+    row: int
+    col: int
+    old: str
+    new: str
+
+    def apply(self, model: "CSVTableModel") -> None:
+        model.setData(model.index(self.row, self.col), self.new)
+
+    def revert(self, model: "CSVTableModel") -> None:
+        model.setData(model.index(self.row, self.col), self.old)
+
+
+@dataclass
+class CellBatch:
+    edits: List[CellEdit]
+
+    def apply(self, model: "CSVTableModel") -> None:
+        model.set_cell_values(self.edits)
+
+    def revert(self, model: "CSVTableModel") -> None:
+        model.set_cell_values(
+            [CellEdit(edit.row, edit.col, edit.new, edit.old) for edit in reversed(self.edits)]
+        )
+
+
+@dataclass
+class HeaderEdit:
+    col: int
+    old: str
+    new: str
+
+    def apply(self, model: "CSVTableModel") -> None:
+        model.setHeaderData(self.col, QtCore.Qt.Orientation.Horizontal, self.new)
+
+    def revert(self, model: "CSVTableModel") -> None:
+        model.setHeaderData(self.col, QtCore.Qt.Orientation.Horizontal, self.old)
+
+
+@dataclass
+class RowInsert:
+    row: int
+    rows: List[List[str]]
+
+    def apply(self, model: "CSVTableModel") -> None:
+        model.insert_row_values(self.row, self.rows)
+
+    def revert(self, model: "CSVTableModel") -> None:
+        model.remove_row_range(self.row, len(self.rows))
+
+
+@dataclass
+class RowRemove:
+    row: int
+    rows: List[List[str]]
+
+    def apply(self, model: "CSVTableModel") -> None:
+        model.remove_row_range(self.row, len(self.rows))
+
+    def revert(self, model: "CSVTableModel") -> None:
+        model.insert_row_values(self.row, self.rows)
+
+
+@dataclass
+class ColInsert:
+    col: int
+    names: List[str]
+    cells: List[List[str]]
+
+    def apply(self, model: "CSVTableModel") -> None:
+        model.insert_column_values(self.col, self.names, self.cells)
+
+    def revert(self, model: "CSVTableModel") -> None:
+        model.remove_column_range(self.col, len(self.names))
+
+
+@dataclass
+class ColRemove:
+    col: int
+    names: List[str]
+    cells: List[List[str]]
+
+    def apply(self, model: "CSVTableModel") -> None:
+        model.remove_column_range(self.col, len(self.names))
+
+    def revert(self, model: "CSVTableModel") -> None:
+        model.insert_column_values(self.col, self.names, self.cells)
+
+
+@dataclass
+class DocumentReplace:
+    old_header: List[str]
+    old_rows: List[List[str]]
+    new_header: List[str]
+    new_rows: List[List[str]]
+
+    def apply(self, model: "CSVTableModel") -> None:
+        model.replace_contents(self.new_header, self.new_rows)
+
+    def revert(self, model: "CSVTableModel") -> None:
+        model.replace_contents(self.old_header, self.old_rows)
+
+
+EditCommand = Union[
+    CellEdit,
+    CellBatch,
+    HeaderEdit,
+    RowInsert,
+    RowRemove,
+    ColInsert,
+    ColRemove,
+    DocumentReplace,
+]
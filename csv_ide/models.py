@@ -1,8 +1,32 @@
+import csv
+import io
+import os
+from collections import Counter
 from dataclasses import dataclass
-from typing import List, Optional
+from functools import cached_property
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, TextIO
 
 from PyQt6 import QtCore, QtGui
 
+from csv_ide.history import (
+    CellBatch,
+    CellEdit,
+    ColInsert,
+    ColRemove,
+    DocumentReplace,
+    HeaderEdit,
+    RowInsert,
+    RowRemove,
+)
+
+_PARSE_CHUNK_ROWS = 65536
+_READ_BLOCK_CHARS = 1 << 20
+_SHARED_VALUE_RATIO = 10
+_SHARED_SAMPLE_ROWS = 2048
+_TEXT_ROLES = frozenset((QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.EditRole))
+_BACKGROUND_ROLE = QtCore.Qt.ItemDataRole.BackgroundRole
+
 
 @dataclass
 class CsvDocument:
@@ -11,32 +35,179 @@ class CsvDocument:
     header: List[str]
     rows: List[List[str]]
 
+    @cached_property
+    def basename(self) -> str:
+        return os.path.basename(self.path)
+
+    def set_path(self, path: str) -> None:
+        self.path = path
+        self.__dict__.pop("basename", None)
+
+
+def parse_csv_document(lines: Iterable[str], path: str, delimiter: str) -> CsvDocument:
+    try:
+        return _build_document(
+            _row_chunks(csv.reader(lines, delimiter=delimiter)), path, delimiter
+        )
+    except csv.Error as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def parse_csv_file(handle: TextIO, path: str, delimiter: str) -> CsvDocument:
+    try:
+        return _build_document(_split_file_chunks(handle, delimiter), path, delimiter)
+    except csv.Error as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def parse_csv_text(text: str, path: str, delimiter: str) -> CsvDocument:
+    if '"' in text or "\r" in text:
+        return parse_csv_document(io.StringIO(text, newline=""), path, delimiter)
+    lines = text.split("\n")
+    if not lines[-1]:
+        lines.pop()
+    reader = (line.split(delimiter) if line else [] for line in lines)
+    return _build_document(_row_chunks(reader), path, delimiter)
+
+
+def _row_chunks(reader: Iterator[List[str]]) -> Iterator[List[List[str]]]:
+    while True:
+        chunk = list(islice(reader, _PARSE_CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _split_file_chunks(handle: TextIO, delimiter: str) -> Iterator[List[List[str]]]:
+    # Reads bounded blocks and splits their complete lines with str.split, so peak
+    # memory stays at one block on top of the parsed rows. From the first block that
+    # holds a quote or CR onwards, the rest of the file goes through csv.reader.
+    carry = ""
+    while True:
+        data = handle.read(_READ_BLOCK_CHARS)
+        if not data:
+            break
+        if '"' in data or "\r" in data:
+            # Finish the current line so csv.reader starts the handle on a line boundary.
+            block = io.StringIO(carry + data + handle.readline(), newline="")
+            yield from _row_chunks(csv.reader(chain(block, handle), delimiter=delimiter))
+            return
+        block = carry + data
+        cut = block.rfind("\n")
+        if cut == -1:
+            carry = block
+            continue
+        carry = block[cut + 1 :]
+        lines = block[:cut].split("\n")
+        del block
+        yield [line.split(delimiter) if line else [] for line in lines]
+    if carry:
+        yield [carry.split(delimiter)]
+
+
+def _build_document(
+    chunks: Iterator[List[List[str]]], path: str, delimiter: str
+) -> CsvDocument:
+    first = next(chunks, None)
+    if not first:
+        return CsvDocument(path, delimiter, [], [])
+    header = first[0]
+    expected_cols = len(header)
+    rows: List[List[str]] = []
+    shared_values: dict[int, dict[str, str]] = {}
+    for chunk in chain((first[1:],), chunks):
+        if not chunk:
+            continue
+        if set(map(len, chunk)) != {expected_cols}:
+            for offset, row in enumerate(chunk):
+                if len(row) != expected_cols:
+                    raise ValueError(
+                        f"Line {len(rows) + offset + 2} has {len(row)} columns, "
+                        f"expected {expected_cols}."
+                    )
+        _share_repeated_values(chunk, expected_cols, shared_values)
+        rows.extend(chunk)
+    return CsvDocument(path, delimiter, header, rows)
+
+
+def _share_repeated_values(
+    chunk: List[List[str]], column_count: int, shared_values: dict[int, dict[str, str]]
+) -> None:
+    # Cardinality is re-checked on every chunk from rows spread across it, so a column
+    # that stops repeating (sorted ids, timestamps) drops its table instead of gaining
+    # an entry for every remaining cell.
+    sample = chunk[:: -(-len(chunk) // _SHARED_SAMPLE_ROWS)]
+    for col in range(column_count):
+        if len({row[col] for row in sample}) * _SHARED_VALUE_RATIO > len(sample):
+            shared_values.pop(col, None)
+            continue
+        shared = shared_values.setdefault(col, {}).setdefault
+        for row in chunk:
+            value = row[col]
+            row[col] = shared(value, value)
+
+
+def serialize_csv_document(document: CsvDocument, delimiter: Optional[str] = None) -> str:
+    if delimiter is None:
+        delimiter = document.delimiter
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+    rows: Iterable[List[str]] = document.rows
+    if document.header:
+        rows = chain((document.header,), rows)
+    parts: List[str] = []
+    for row in rows:
+        line = delimiter.join(row)
+        if (
+            line
+            and '"' not in line
+            and "\n" not in line
+            and "\r" not in line
+            and line.count(delimiter) == len(row) - 1
+        ):
+            parts.append(line)
+            parts.append("\r\n")
+        else:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(row)
+            parts.append(buffer.getvalue())
+    return "".join(parts)
+
 
 class CSVTableModel(QtCore.QAbstractTableModel):
+    command_recorded = QtCore.pyqtSignal(object)
+
     def __init__(self, document: CsvDocument, parent: Optional[QtCore.QObject] = None) -> None:
         super().__init__(parent)
         self._document = document
         self._row_colors: dict[int, str] = {}
+        self._row_count = len(document.rows)
+        self._col_count = len(document.header)
+        self._header_names = Counter(document.header)
 
     def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
         if parent.isValid():
             return 0
-        return len(self._document.rows)
+        return self._row_count
 
     def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
         if parent.isValid():
             return 0
-        return len(self._document.header)
+        return self._col_count
 
     def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.ItemDataRole.DisplayRole):
-        if not index.isValid():
-            return None
-        if role in (QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.EditRole):
-            try:
-                return self._document.rows[index.row()][index.column()]
-            except IndexError:
+        if role in _TEXT_ROLES:
+            if not index.isValid():
+                return None
+            rows = self._document.rows
+            r = index.row()
+            if r >= len(rows):
                 return ""
-        if role == QtCore.Qt.ItemDataRole.BackgroundRole:
+            row = rows[r]
+            c = index.column()
+            return row[c] if c < len(row) else ""
+        if role == _BACKGROUND_ROLE and index.isValid():
             color = self._row_colors.get(index.row())
             if color:
                 return QtGui.QBrush(QtGui.QColor(color))
@@ -47,13 +218,35 @@ class CSVTableModel(QtCore.QAbstractTableModel):
             return False
         while index.row() >= len(self._document.rows):
             self._document.rows.append([""] * len(self._document.header))
+            self._row_count += 1
         row = self._document.rows[index.row()]
         while index.column() >= len(row):
             row.append("")
-        row[index.column()] = str(value)
+        old = row[index.column()]
+        new = str(value)
+        row[index.column()] = new
         self.dataChanged.emit(index, index, [role])
+        if old != new:
+            self.command_recorded.emit(CellEdit(index.row(), index.column(), old, new))
         return True
 
+    def set_cell_values(self, edits: List[CellEdit]) -> None:
+        if not edits:
+            return
+        rows = self._document.rows
+        for edit in edits:
+            rows[edit.row][edit.col] = edit.new
+        top = min(edit.row for edit in edits)
+        bottom = max(edit.row for edit in edits)
+        left = min(edit.col for edit in edits)
+        right = max(edit.col for edit in edits)
+        self.dataChanged.emit(
+            self.index(top, left),
+            self.index(bottom, right),
+            [QtCore.Qt.ItemDataRole.EditRole],
+        )
+        self.command_recorded.emit(CellBatch(edits))
+
     def flags(self, index: QtCore.QModelIndex) -> QtCore.Qt.ItemFlag:
         if not index.isValid():
             return QtCore.Qt.ItemFlag.NoItemFlags
@@ -87,15 +280,34 @@ class CSVTableModel(QtCore.QAbstractTableModel):
             return False
         while section >= len(self._document.header):
             self._document.header.append("")
-        self._document.header[section] = str(value)
+            self._col_count += 1
+            self._header_names[""] += 1
+        old = self._document.header[section]
+        new = str(value)
+        self._document.header[section] = new
+        self._header_names[old] -= 1
+        self._header_names[new] += 1
         self.headerDataChanged.emit(orientation, section, section)
+        if old != new:
+            self.command_recorded.emit(HeaderEdit(section, old, new))
         return True
 
-    def set_document(self, document: CsvDocument) -> None:
-        self.beginResetModel()
-        self._document = document
-        self._normalize_row_colors()
-        self.endResetModel()
+    def replace_contents(self, header: List[str], rows: List[List[str]]) -> None:
+        old_header = self._document.header
+        old_rows = self._document.rows
+        if self._has_shape(header, rows):
+            self._document.header = header
+            self._document.rows = rows
+            self._update_counts()
+            self._emit_contents_changed()
+        else:
+            self.beginResetModel()
+            self._document.header = header
+            self._document.rows = rows
+            self._update_counts()
+            self._normalize_row_colors()
+            self.endResetModel()
+        self.command_recorded.emit(DocumentReplace(old_header, old_rows, header, rows))
 
     def insertRows(
         self, row: int, count: int, parent: QtCore.QModelIndex = QtCore.QModelIndex()
@@ -103,13 +315,19 @@ class CSVTableModel(QtCore.QAbstractTableModel):
         if parent.isValid() or count <= 0:
             return False
         row = max(0, min(row, len(self._document.rows)))
-        self.beginInsertRows(parent, row, row + count - 1)
-        for _ in range(count):
-            self._document.rows.insert(row, [""] * len(self._document.header))
+        width = len(self._document.header)
+        self.insert_row_values(row, [[""] * width for _ in range(count)])
+        return True
+
+    def insert_row_values(self, row: int, values: List[List[str]]) -> None:
+        count = len(values)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row + count - 1)
+        self._document.rows[row:row] = values
+        self._row_count += count
         self.endInsertRows()
         self._shift_row_colors_on_insert(row, count)
         self._emit_row_color_refresh(row)
-        return True
+        self.command_recorded.emit(RowInsert(row, values))
 
     def removeRows(
         self, row: int, count: int, parent: QtCore.QModelIndex = QtCore.QModelIndex()
@@ -119,12 +337,19 @@ class CSVTableModel(QtCore.QAbstractTableModel):
         if row < 0 or row >= len(self._document.rows):
             return False
         end_row = min(row + count - 1, len(self._document.rows) - 1)
-        self.beginRemoveRows(parent, row, end_row)
+        self.remove_row_range(row, end_row - row + 1)
+        return True
+
+    def remove_row_range(self, row: int, count: int) -> None:
+        end_row = row + count - 1
+        self.beginRemoveRows(QtCore.QModelIndex(), row, end_row)
+        removed = self._document.rows[row : end_row + 1]
         del self._document.rows[row : end_row + 1]
+        self._row_count -= count
         self.endRemoveRows()
-        self._shift_row_colors_on_remove(row, end_row - row + 1)
+        self._shift_row_colors_on_remove(row, count)
         self._emit_row_color_refresh(row)
-        return True
+        self.command_recorded.emit(RowRemove(row, removed))
 
     def insertColumns(
         self, column: int, count: int, parent: QtCore.QModelIndex = QtCore.QModelIndex()
@@ -132,15 +357,23 @@ class CSVTableModel(QtCore.QAbstractTableModel):
         if parent.isValid() or count <= 0:
             return False
         column = max(0, min(column, len(self._document.header)))
-        self.beginInsertColumns(parent, column, column + count - 1)
-        for offset in range(count):
-            self._document.header.insert(column + offset, "")
-        for row in self._document.rows:
-            for offset in range(count):
-                row.insert(column + offset, "")
-        self.endInsertColumns()
+        self.insert_column_values(
+            column, [""] * count, [[""] * count for _ in self._document.rows]
+        )
         return True
 
+    def insert_column_values(
+        self, column: int, names: List[str], cells: List[List[str]]
+    ) -> None:
+        self.beginInsertColumns(QtCore.QModelIndex(), column, column + len(names) - 1)
+        self._document.header[column:column] = names
+        for row, values in zip(self._document.rows, cells):
+            row[column:column] = values
+        self._col_count += len(names)
+        self._header_names.update(names)
+        self.endInsertColumns()
+        self.command_recorded.emit(ColInsert(column, names, cells))
+
     def removeColumns(
         self, column: int, count: int, parent: QtCore.QModelIndex = QtCore.QModelIndex()
     ) -> bool:
@@ -149,12 +382,42 @@ class CSVTableModel(QtCore.QAbstractTableModel):
         if column < 0 or column >= len(self._document.header):
             return False
         end_col = min(column + count - 1, len(self._document.header) - 1)
-        self.beginRemoveColumns(parent, column, end_col)
+        self.remove_column_range(column, end_col - column + 1)
+        return True
+
+    def remove_column_range(self, column: int, count: int) -> None:
+        end_col = column + count - 1
+        self.beginRemoveColumns(QtCore.QModelIndex(), column, end_col)
+        names = self._document.header[column : end_col + 1]
         del self._document.header[column : end_col + 1]
+        cells: List[List[str]] = []
         for row in self._document.rows:
+            cells.append(row[column : end_col + 1])
             del row[column : end_col + 1]
+        self._col_count -= count
+        self._header_names.subtract(names)
         self.endRemoveColumns()
-        return True
+        self.command_recorded.emit(ColRemove(column, names, cells))
+
+    def _update_counts(self) -> None:
+        self._row_count = len(self._document.rows)
+        self._col_count = len(self._document.header)
+        self._header_names = Counter(self._document.header)
+
+    def _has_shape(self, header: List[str], rows: List[List[str]]) -> bool:
+        return len(header) == self._col_count and len(rows) == self._row_count
+
+    def _emit_contents_changed(self) -> None:
+        if self._col_count <= 0:
+            return
+        self.headerDataChanged.emit(QtCore.Qt.Orientation.Horizontal, 0, self._col_count - 1)
+        if self._row_count > 0:
+            self.dataChanged.emit(
+                self.index(0, 0), self.index(self._row_count - 1, self._col_count - 1)
+            )
+
+    def has_header_name(self, name: str) -> bool:
+        return self._header_names[name] > 0
 
     def row_colors(self) -> dict[int, str]:
         return dict(self._row_colors)
@@ -0,0 +1,116 @@
+# Long-lived plugin runner started by MainWindow. Reads one JSON job per line on
+# stdin, forks a child per job so each script gets a clean interpreter state without
+# paying interpreter start-up again, and writes one JSON result per line on stdout.
+import json
+import os
+import runpy
+import selectors
+import sys
+import traceback
+
+
+def _run_child(script: str, cwd: str, env: dict, stdout_fd: int, stderr_fd: int) -> None:
+    exit_code = 0
+    try:
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        if cwd:
+            os.chdir(cwd)
+        os.environ.update({str(key): str(value) for key, value in env.items()})
+        sys.argv = [script]
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as exc:
+        if exc.code is None:
+            exit_code = 0
+        elif isinstance(exc.code, int):
+            exit_code = exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as exc:
+        tb = exc.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        traceback.print_exception(type(exc), exc, tb or exc.__traceback__)
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+def _collect(stdout_read: int, stderr_read: int) -> tuple[bytes, bytes]:
+    chunks: dict[int, list[bytes]] = {stdout_read: [], stderr_read: []}
+    with selectors.DefaultSelector() as selector:
+        selector.register(stdout_read, selectors.EVENT_READ)
+        selector.register(stderr_read, selectors.EVENT_READ)
+        open_fds = 2
+        while open_fds:
+            for key, _ in selector.select():
+                data = os.read(key.fd, 65536)
+                if data:
+                    chunks[key.fd].append(data)
+                else:
+                    selector.unregister(key.fd)
+                    open_fds -= 1
+    return b"".join(chunks[stdout_read]), b"".join(chunks[stderr_read])
+
+
+def _run_job(job: dict) -> dict:
+    script = job.get("script", "")
+    cwd = job.get("cwd", "")
+    env = job.get("env")
+    if not isinstance(env, dict):
+        env = {}
+    stdout_read, stdout_write = os.pipe()
+    stderr_read, stderr_write = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        os.close(stdout_read)
+        os.close(stderr_read)
+        _run_child(script, cwd, env, stdout_write, stderr_write)
+    os.close(stdout_write)
+    os.close(stderr_write)
+    try:
+        out, err = _collect(stdout_read, stderr_read)
+    finally:
+        os.close(stdout_read)
+        os.close(stderr_read)
+    _, status = os.waitpid(pid, 0)
+    exit_code = os.waitstatus_to_exitcode(status)
+    return {
+        "id": job.get("id"),
+        "exit_code": exit_code,
+        "stdout": out.decode("utf-8", errors="replace"),
+        "stderr": err.decode("utf-8", errors="replace"),
+    }
+
+
+def main() -> None:
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(job, dict):
+            continue
+        try:
+            result = _run_job(job)
+        except OSError as exc:
+            result = {"id": job.get("id"), "exit_code": 1, "stdout": "", "stderr": str(exc)}
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
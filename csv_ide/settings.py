@@ -0,0 +1,26 @@
+from PyQt6 import QtCore
+
+ORGANIZATION = "RussellCsv"
+APPLICATION = "RussellCsv"
+
+
+def app_settings() -> QtCore.QSettings:
+    settings = QtCore.QSettings(
+        QtCore.QSettings.Format.IniFormat,
+        QtCore.QSettings.Scope.UserScope,
+        ORGANIZATION,
+        APPLICATION,
+    )
+    if not settings.allKeys():
+        _migrate_native_settings(settings)
+    return settings
+
+
+def _migrate_native_settings(settings: QtCore.QSettings) -> None:
+    legacy = QtCore.QSettings(ORGANIZATION, APPLICATION)
+    keys = legacy.allKeys()
+    if not keys:
+        return
+    for key in keys:
+        settings.setValue(key, legacy.value(key))
+    settings.sync()
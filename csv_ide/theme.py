@@ -1,21 +1,113 @@
-from PyQt6 import QtGui, QtWidgets
-
-
-def theme_palette(name: str) -> dict[str, str]:
-    if name == "dark":
-        return {
-            "window": "#121416",
-            "base": "#1B1F22",
-            "base_alt": "#22272B",
-            "text": "#E6E6E6",
-            "muted": "#A7B0B7",
-            "border": "#2E3439",
-            "button": "#1F2428",
-            "button_pressed": "#262C31",
-            "accent": "#F2A93B",
-            "accent_text": "#1A1A1A",
-        }
-    return {
+import os
+import tempfile
+from functools import lru_cache
+from string import Template
+from types import MappingProxyType
+from typing import Mapping
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+from csv_ide.settings import APPLICATION
+
+_STYLESHEET_TEMPLATE = Template(
+    """
+    QMainWindow {
+        background: $window;
+    }
+    QWidget {
+        font-family: "Avenir Next", "Avenir", "Helvetica Neue", "Arial";
+        font-size: 13px;
+    }
+    QToolBar, QMenuBar, QMenu {
+        background: $window;
+        color: $text;
+    }
+    QMenu::item:selected {
+        background: $accent;
+        color: $accent_text;
+    }
+    QLineEdit, QPlainTextEdit, QTextEdit, QComboBox {
+        background: $base;
+        color: $text;
+        border: 1px solid $border;
+        border-radius: 6px;
+        padding: 6px 8px;
+        selection-background-color: $accent;
+        selection-color: $accent_text;
+    }
+    QTableView {
+        background: $base;
+        alternate-background-color: $base_alt;
+        gridline-color: $border;
+        selection-background-color: $accent;
+        selection-color: $accent_text;
+    }
+    QTableView::item:selected {
+        background: $accent;
+        color: $accent_text;
+    }
+    QListWidget {
+        background: $base;
+        border: 1px solid $border;
+        border-radius: 6px;
+    }
+    QPushButton, QToolButton {
+        background: $button;
+        color: $text;
+        border: 1px solid $border;
+        border-radius: 8px;
+        padding: 6px 10px;
+    }
+    QPushButton:hover, QToolButton:hover {
+        border-color: $accent;
+    }
+    QPushButton:pressed, QToolButton:pressed {
+        background: $button_pressed;
+    }
+    QTabBar::tab {
+        background: $base;
+        color: $text;
+        padding: 6px 12px;
+        border: 1px solid $border;
+        border-bottom: none;
+        border-top-left-radius: 8px;
+        border-top-right-radius: 8px;
+        margin-right: 2px;
+    }
+    QTabBar::tab:selected {
+        background: $window;
+        border-color: $accent;
+    }
+    QStatusBar {
+        background: $window;
+        color: $muted;
+    }
+    QToolTip {
+        color: $accent;
+        background: $base;
+        border: 1px solid $border;
+    }
+    """
+)
+
+
+_DARK_PALETTE: Mapping[str, str] = MappingProxyType(
+    {
+        "window": "#121416",
+        "base": "#1B1F22",
+        "base_alt": "#22272B",
+        "text": "#E6E6E6",
+        "muted": "#A7B0B7",
+        "border": "#2E3439",
+        "button": "#1F2428",
+        "button_pressed": "#262C31",
+        "accent": "#F2A93B",
+        "accent_text": "#1A1A1A",
+    }
+)
+
+_LIGHT_PALETTE: Mapping[str, str] = MappingProxyType(
+    {
         "window": "#F6F4F0",
         "base": "#FFFFFF",
         "base_alt": "#F2EFEA",
@@ -27,6 +119,51 @@ def theme_palette(name: str) -> dict[str, str]:
         "accent": "#C87B12",
         "accent_text": "#FFFFFF",
     }
+)
+
+
+def theme_palette(name: str) -> Mapping[str, str]:
+    return _DARK_PALETTE if name == "dark" else _LIGHT_PALETTE
+
+
+@lru_cache(maxsize=None)
+def _build_stylesheet(name: str) -> str:
+    return _STYLESHEET_TEMPLATE.substitute(theme_palette(name))
+
+
+_STYLESHEET_CACHE_PATHS: dict[str, str] = {}
+
+
+def _stylesheet_cache_dir() -> str:
+    base = QtCore.QStandardPaths.writableLocation(
+        QtCore.QStandardPaths.StandardLocation.GenericCacheLocation
+    )
+    directory = os.path.join(base or os.path.expanduser("~"), APPLICATION)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return directory
+
+
+def stylesheet_cache_path(name: str) -> str:
+    path = _STYLESHEET_CACHE_PATHS.get(name)
+    if path is not None and os.path.isfile(path):
+        return path
+    directory = _stylesheet_cache_dir()
+    path = os.path.join(directory, f"{name}.qss")
+    # Write a private temp file and rename it over the target so an existing
+    # symlink at the target path is replaced rather than followed.
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(_build_stylesheet(name))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _STYLESHEET_CACHE_PATHS[name] = path
+    return path
 
 
 def apply_theme(app: QtWidgets.QApplication, name: str) -> None:
@@ -49,83 +186,4 @@ def apply_theme(app: QtWidgets.QApplication, name: str) -> None:
     )
     app.setPalette(palette)
 
-    app.setStyleSheet(
-        f"""
-        QMainWindow {{
-            background: {colors['window']};
-        }}
-        QWidget {{
-            font-family: "Avenir Next", "Avenir", "Helvetica Neue", "Arial";
-            font-size: 13px;
-        }}
-        QToolBar, QMenuBar, QMenu {{
-            background: {colors['window']};
-            color: {colors['text']};
-        }}
-        QMenu::item:selected {{
-            background: {colors['accent']};
-            color: {colors['accent_text']};
-        }}
-        QLineEdit, QPlainTextEdit, QTextEdit, QComboBox {{
-            background: {colors['base']};
-            color: {colors['text']};
-            border: 1px solid {colors['border']};
-            border-radius: 6px;
-            padding: 6px 8px;
-            selection-background-color: {colors['accent']};
-            selection-color: {colors['accent_text']};
-        }}
-        QTableView {{
-            background: {colors['base']};
-            alternate-background-color: {colors['base_alt']};
-            gridline-color: {colors['border']};
-            selection-background-color: {colors['accent']};
-            selection-color: {colors['accent_text']};
-        }}
-        QTableView::item:selected {{
-            background: {colors['accent']};
-            color: {colors['accent_text']};
-        }}
-        QListWidget {{
-            background: {colors['base']};
-            border: 1px solid {colors['border']};
-            border-radius: 6px;
-        }}
-        QPushButton, QToolButton {{
-            background: {colors['button']};
-            color: {colors['text']};
-            border: 1px solid {colors['border']};
-            border-radius: 8px;
-            padding: 6px 10px;
-        }}
-        QPushButton:hover, QToolButton:hover {{
-            border-color: {colors['accent']};
-        }}
-        QPushButton:pressed, QToolButton:pressed {{
-            background: {colors['button_pressed']};
-        }}
-        QTabBar::tab {{
-            background: {colors['base']};
-            color: {colors['text']};
-            padding: 6px 12px;
-            border: 1px solid {colors['border']};
-            border-bottom: none;
-            border-top-left-radius: 8px;
-            border-top-right-radius: 8px;
-            margin-right: 2px;
-        }}
-        QTabBar::tab:selected {{
-            background: {colors['window']};
-            border-color: {colors['accent']};
-        }}
-        QStatusBar {{
-            background: {colors['window']};
-            color: {colors['muted']};
-        }}
-        QToolTip {{
-            color: {colors['accent']};
-            background: {colors['base']};
-            border: 1px solid {colors['border']};
-        }}
-        """
-    )
+    app.setStyleSheet(_build_stylesheet(name))
@@ -1,11 +1,53 @@
 import csv
 import io
 import re
-from typing import List, Optional
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Callable, List, Optional
 
 from PyQt6 import QtCore, QtGui, QtWidgets
 
-from csv_ide.models import CsvDocument, CSVTableModel
+from csv_ide.history import CellEdit, EditCommand
+from csv_ide.models import (
+    CsvDocument,
+    CSVTableModel,
+    parse_csv_text,
+    serialize_csv_document,
+)
+
+_UNDO_LIMIT = 1000
+_CELL_EDIT_MERGE_SECONDS = 0.5
+
+
+@lru_cache(maxsize=32)
+def _find_pattern(text: str, case_sensitive: bool) -> re.Pattern[str]:
+    return re.compile(re.escape(text), 0 if case_sensitive else re.IGNORECASE)
+
+
+def _contiguous_runs(values: set[int]) -> List[tuple[int, int]]:
+    runs: List[tuple[int, int]] = []
+    for value in sorted(values):
+        if runs and runs[-1][0] + runs[-1][1] == value:
+            runs[-1] = (runs[-1][0], runs[-1][1] + 1)
+        else:
+            runs.append((value, 1))
+    return runs
+
+
+class _SerializeSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(int, str)
+
+
+class _SerializeTask(QtCore.QRunnable):
+    def __init__(self, generation: int, document: CsvDocument, signals: _SerializeSignals) -> None:
+        super().__init__()
+        self._generation = generation
+        self._document = document
+        self._signals = signals
+
+    def run(self) -> None:
+        self._signals.finished.emit(self._generation, serialize_csv_document(self._document))
 
 
 class ConflictHighlighter(QtGui.QSyntaxHighlighter):
@@ -47,6 +89,7 @@ class EditorWidget(QtWidgets.QWidget):
     document_changed = QtCore.pyqtSignal(str)
     cell_selected = QtCore.pyqtSignal(int, int, str)
     table_state_changed = QtCore.pyqtSignal()
+    dirty_changed = QtCore.pyqtSignal(bool)
 
     def __init__(
         self,
@@ -57,13 +100,19 @@ class EditorWidget(QtWidgets.QWidget):
     ) -> None:
         super().__init__(parent)
         self._document = document
-        self._undo_stack: List[CsvDocument] = []
-        self._undo_index = -1
+        self._undo_stack: deque[EditCommand] = deque(maxlen=_UNDO_LIMIT)
+        self._redo_stack: deque[EditCommand] = deque(maxlen=_UNDO_LIMIT)
+        self._last_push_time = 0.0
         self._ignore_history = False
         self._dirty = False
         self._parse_error: Optional[str] = None
         self._code_source_text: Optional[str] = None
         self._custom_row_heights: dict[int, int] = {}
+        self._lowered_lines: Optional[List[str]] = None
+        self._serialize_signals = _SerializeSignals()
+        self._serialize_signals.finished.connect(self._on_code_serialized)
+        self._serialize_generation = 0
+        self._serialize_pending = False
 
         self._toggle_group = QtWidgets.QButtonGroup(self)
         self._grid_button = QtWidgets.QToolButton(self)
@@ -140,7 +189,8 @@ class EditorWidget(QtWidgets.QWidget):
         self._model.columnsRemoved.connect(lambda *_: self._on_model_changed())
         self._model.rowsInserted.connect(lambda *_: self.table_state_changed.emit())
         self._model.rowsRemoved.connect(lambda *_: self.table_state_changed.emit())
-        self._push_history()
+        self._model.modelReset.connect(self._invalidate_search_lines)
+        self._model.command_recorded.connect(self._push_command)
 
         if raw_text is not None:
             self._code_source_text = raw_text
@@ -160,20 +210,26 @@ class EditorWidget(QtWidgets.QWidget):
         return self._dirty
 
     def set_dirty(self, dirty: bool) -> None:
-        self._dirty = dirty
+        self._set_dirty_flag(dirty)
         self.document_changed.emit(self._document.path)
 
+    def _set_dirty_flag(self, dirty: bool) -> None:
+        if dirty == self._dirty:
+            return
+        self._dirty = dirty
+        self.dirty_changed.emit(dirty)
+
     def set_document(self, document: CsvDocument) -> None:
-        self._document = document
-        self._model.set_document(document)
-        self._push_history()
-        self._dirty = False
+        self._document.delimiter = document.delimiter
+        self._replace_contents(document)
+        self._set_dirty_flag(False)
         self._code_source_text = None
         self._set_parse_error(None)
         if self._stack.currentIndex() == 1:
-            self._code_edit.setPlainText(self._serialize_document())
+            self._start_code_serialization()
 
     def show_parse_error(self, raw_text: str, message: str) -> None:
+        self._cancel_code_serialization()
         self._code_source_text = raw_text
         self._code_edit.blockSignals(True)
         self._code_edit.setPlainText(raw_text)
@@ -181,27 +237,50 @@ class EditorWidget(QtWidgets.QWidget):
         self._set_parse_error(message)
         self._code_button.setChecked(True)
         self._stack.setCurrentIndex(1)
-        self._dirty = False
+        self._set_dirty_flag(False)
+
+    def _start_code_serialization(self) -> None:
+        self._serialize_generation += 1
+        self._serialize_pending = True
+        self._code_edit.blockSignals(True)
+        self._code_edit.clear()
+        self._code_edit.blockSignals(False)
+        self._code_edit.setPlaceholderText("Loading...")
+        self._code_edit.setReadOnly(True)
+        self._grid_button.setEnabled(False)
+        snapshot = CsvDocument(
+            self._document.path,
+            self._document.delimiter,
+            list(self._document.header),
+            # Rows are copied too, since grid edits mutate them in place.
+            [row[:] for row in self._document.rows],
+        )
+        QtCore.QThreadPool.globalInstance().start(
+            _SerializeTask(self._serialize_generation, snapshot, self._serialize_signals)
+        )
 
-    def _serialize_document(self) -> str:
-        buffer = io.StringIO()
-        writer = csv.writer(buffer, delimiter=self._document.delimiter)
-        if self._document.header:
-            writer.writerow(self._document.header)
-        writer.writerows(self._document.rows)
-        return buffer.getvalue()
+    def _cancel_code_serialization(self) -> None:
+        if not self._serialize_pending:
+            return
+        self._serialize_generation += 1
+        self._finish_code_serialization()
+
+    def _finish_code_serialization(self) -> None:
+        self._serialize_pending = False
+        self._code_edit.setPlaceholderText("")
+        self._code_edit.setReadOnly(False)
+        self._grid_button.setEnabled(True)
+
+    def _on_code_serialized(self, generation: int, text: str) -> None:
+        if generation != self._serialize_generation:
+            return
+        self._finish_code_serialization()
+        self._code_edit.blockSignals(True)
+        self._code_edit.setPlainText(text)
+        self._code_edit.blockSignals(False)
 
     def _parse_csv_text(self, text: str) -> Optional[CsvDocument]:
-        reader = csv.reader(io.StringIO(text), delimiter=self._document.delimiter)
-        rows = list(reader)
-        if not rows:
-            return CsvDocument(self._document.path, self._document.delimiter, [], [])
-        header = rows[0]
-        expected_cols = len(header)
-        for idx, row in enumerate(rows[1:], start=2):
-            if len(row) != expected_cols:
-                raise ValueError(f"Line {idx} has {len(row)} columns, expected {expected_cols}.")
-        return CsvDocument(self._document.path, self._document.delimiter, header, rows[1:])
+        return parse_csv_text(text, self._document.path, self._document.delimiter)
 
     def _set_parse_error(self, message: Optional[str]) -> None:
         self._parse_error = message
@@ -217,14 +296,19 @@ class EditorWidget(QtWidgets.QWidget):
         if not checked:
             return
         if button is self._code_button:
-            self._code_edit.blockSignals(True)
             if self._parse_error and self._code_source_text is not None:
+                self._cancel_code_serialization()
+                self._code_edit.blockSignals(True)
                 self._code_edit.setPlainText(self._code_source_text)
+                self._code_edit.blockSignals(False)
             else:
-                self._code_edit.setPlainText(self._serialize_document())
-            self._code_edit.blockSignals(False)
+                self._start_code_serialization()
             self._stack.setCurrentIndex(1)
         else:
+            if self._serialize_pending:
+                self._cancel_code_serialization()
+                self._stack.setCurrentIndex(0)
+                return
             text = self._code_edit.toPlainText()
             try:
                 parsed = self._parse_csv_text(text)
@@ -234,9 +318,7 @@ class EditorWidget(QtWidgets.QWidget):
                 self._stack.setCurrentIndex(0)
                 return
             if parsed is not None:
-                self._document = parsed
-                self._model.set_document(parsed)
-                self._push_history()
+                self._replace_contents(parsed)
                 self.document_changed.emit(parsed.path)
             self._code_source_text = None
             self._set_parse_error(None)
@@ -246,13 +328,12 @@ class EditorWidget(QtWidgets.QWidget):
         if self._stack.currentIndex() == 1:
             if self._parse_error is not None:
                 self._code_source_text = self._code_edit.toPlainText()
-            self._dirty = True
+            self._set_dirty_flag(True)
             self.document_changed.emit(self._document.path)
 
     def _on_model_changed(self) -> None:
-        if not self._ignore_history:
-            self._push_history()
-        self._dirty = True
+        self._lowered_lines = None
+        self._set_dirty_flag(True)
         self.document_changed.emit(self._document.path)
         current = self._table_view.selectionModel().currentIndex()
         if current.isValid():
@@ -292,10 +373,15 @@ class EditorWidget(QtWidgets.QWidget):
             return
         prefix, number_text, suffix = match.groups()
         base = int(number_text)
+        rows = self._document.rows
+        edits: List[CellEdit] = []
         for index in selection:
             row = index.row()
             new_value = f"{prefix}{base + (row - anchor_row)}{suffix}"
-            self._model.setData(index, new_value)
+            old_value = rows[row][col]
+            if old_value != new_value:
+                edits.append(CellEdit(row, col, old_value, new_value))
+        self._model.set_cell_values(edits)
 
     def _on_column_resized(self, *_: object) -> None:
         self._resize_current_row_height()
@@ -322,14 +408,14 @@ class EditorWidget(QtWidgets.QWidget):
         max_height = default_height
         padding = 6
         col_count = self._model.columnCount()
+        doc = QtGui.QTextDocument()
+        doc.setDefaultFont(font)
         for col in range(col_count):
             index = self._model.index(row, col)
             text = self._model.data(index, QtCore.Qt.ItemDataRole.DisplayRole)
             if text is None:
                 text = ""
             width = max(self._table_view.columnWidth(col) - padding * 2, 1)
-            doc = QtGui.QTextDocument()
-            doc.setDefaultFont(font)
             doc.setPlainText(str(text))
             doc.setTextWidth(width)
             height = int(doc.size().height()) + padding * 2
@@ -385,48 +471,64 @@ class EditorWidget(QtWidgets.QWidget):
                         mapping[row] = color
             self._model.set_row_colors(mapping)
 
-    def _snapshot(self) -> CsvDocument:
-        header = list(self._document.header)
-        rows = [list(row) for row in self._document.rows]
-        return CsvDocument(self._document.path, self._document.delimiter, header, rows)
+    def _replace_contents(self, document: CsvDocument) -> None:
+        if document.header == self._document.header and document.rows == self._document.rows:
+            return
+        self._model.replace_contents(document.header, document.rows)
 
-    def _push_history(self) -> None:
-        snapshot = self._snapshot()
-        if self._undo_index >= 0 and self._undo_index < len(self._undo_stack):
-            current = self._undo_stack[self._undo_index]
-            if current.header == snapshot.header and current.rows == snapshot.rows:
-                return
-        if self._undo_index < len(self._undo_stack) - 1:
-            self._undo_stack = self._undo_stack[: self._undo_index + 1]
-        self._undo_stack.append(snapshot)
-        self._undo_index = len(self._undo_stack) - 1
+    def _push_command(self, command: EditCommand) -> None:
+        if self._ignore_history:
+            return
+        now = time.monotonic()
+        top = self._undo_stack[-1] if self._undo_stack else None
+        if (
+            isinstance(command, CellEdit)
+            and isinstance(top, CellEdit)
+            and top.row == command.row
+            and top.col == command.col
+            and now - self._last_push_time < _CELL_EDIT_MERGE_SECONDS
+        ):
+            top.new = command.new
+        else:
+            self._undo_stack.append(command)
+        self._last_push_time = now
+        self._redo_stack.clear()
+
+    def set_undo_limit(self, limit: int) -> None:
+        limit = max(1, limit)
+        if limit == self._undo_stack.maxlen:
+            return
+        self._undo_stack = deque(self._undo_stack, maxlen=limit)
+        self._redo_stack = deque(self._redo_stack, maxlen=limit)
 
     def can_undo(self) -> bool:
-        return self._undo_index > 0
+        return bool(self._undo_stack)
 
     def can_redo(self) -> bool:
-        return self._undo_index < len(self._undo_stack) - 1
+        return bool(self._redo_stack)
 
     def undo(self) -> None:
         if not self.can_undo():
             return
-        self._undo_index -= 1
-        self._restore_history(self._undo_stack[self._undo_index])
+        command = self._undo_stack.pop()
+        self._replay(command.revert)
+        self._redo_stack.append(command)
 
     def redo(self) -> None:
         if not self.can_redo():
             return
-        self._undo_index += 1
-        self._restore_history(self._undo_stack[self._undo_index])
+        command = self._redo_stack.pop()
+        self._replay(command.apply)
+        self._undo_stack.append(command)
 
-    def _restore_history(self, snapshot: CsvDocument) -> None:
+    def _replay(self, action: Callable[[CSVTableModel], None]) -> None:
+        self._last_push_time = 0.0
         self._ignore_history = True
-        self._document = self._snapshot()
-        self._document.header = list(snapshot.header)
-        self._document.rows = [list(row) for row in snapshot.rows]
-        self._model.set_document(self._document)
-        self._ignore_history = False
-        self._dirty = True
+        try:
+            action(self._model)
+        finally:
+            self._ignore_history = False
+        self._set_dirty_flag(True)
         self.document_changed.emit(self._document.path)
 
     def insert_row_above(self) -> None:
@@ -443,39 +545,37 @@ class EditorWidget(QtWidgets.QWidget):
         selection = self._table_view.selectionModel().selectedIndexes()
         if not selection:
             return
-        rows = sorted({idx.row() for idx in selection})
-        for row in reversed(rows):
-            self._model.removeRows(row, 1)
+        for start, count in reversed(_contiguous_runs({idx.row() for idx in selection})):
+            self._model.removeRows(start, count)
 
     def insert_col_left(self) -> None:
         selection = self._table_view.selectionModel().selectedIndexes()
         col = min((idx.column() for idx in selection), default=0)
-        self._model.insertColumns(col, 1)
-        self._document.header[col] = self._generate_column_name()
-        self._model.headerDataChanged.emit(QtCore.Qt.Orientation.Horizontal, col, col)
+        self._insert_named_column(col)
 
     def insert_col_right(self) -> None:
         selection = self._table_view.selectionModel().selectedIndexes()
         col = max((idx.column() for idx in selection), default=-1) + 1
-        self._model.insertColumns(col, 1)
-        self._document.header[col] = self._generate_column_name()
-        self._model.headerDataChanged.emit(QtCore.Qt.Orientation.Horizontal, col, col)
+        self._insert_named_column(col)
+
+    def _insert_named_column(self, col: int) -> None:
+        col = max(0, min(col, len(self._document.header)))
+        name = self._generate_column_name()
+        self._model.insert_column_values(col, [name], [[""] for _ in self._document.rows])
 
     def delete_cols(self) -> None:
         selection = self._table_view.selectionModel().selectedIndexes()
         if not selection:
             return
-        cols = sorted({idx.column() for idx in selection})
-        for col in reversed(cols):
-            self._model.removeColumns(col, 1)
+        for start, count in reversed(_contiguous_runs({idx.column() for idx in selection})):
+            self._model.removeColumns(start, count)
 
     def _generate_column_name(self) -> str:
         base = "new_column"
-        existing = {name for name in self._document.header if name}
-        if base not in existing:
+        if not self._model.has_header_name(base):
             return base
         counter = 2
-        while f"{base}_{counter}" in existing:
+        while self._model.has_header_name(f"{base}_{counter}"):
             counter += 1
         return f"{base}_{counter}"
 
@@ -507,9 +607,14 @@ class EditorWidget(QtWidgets.QWidget):
     def _clear_selected_cells(self) -> None:
         selection = self._table_view.selectionModel().selectedIndexes()
         targets = selection or [self._table_view.selectionModel().currentIndex()]
+        rows = self._document.rows
+        edits: List[CellEdit] = []
         for index in targets:
             if index.isValid():
-                self._model.setData(index, "")
+                row, col = index.row(), index.column()
+                if rows[row][col]:
+                    edits.append(CellEdit(row, col, rows[row][col], ""))
+        self._model.set_cell_values(edits)
 
     def eventFilter(self, obj: QtCore.QObject, event: QtCore.QEvent) -> bool:
         if obj is self._table_view and event.type() == QtCore.QEvent.Type.KeyPress:
@@ -569,14 +674,17 @@ class EditorWidget(QtWidgets.QWidget):
         needed_rows = start_row + len(rows) - self._model.rowCount()
         if needed_rows > 0:
             self._model.insertRows(self._model.rowCount(), needed_rows)
+        document_rows = self._document.rows
+        edits: List[CellEdit] = []
         for r, row in enumerate(rows):
             if not row:
                 continue
+            target_row = document_rows[start_row + r]
             row = row[: max_cols - start_col]
-            for c, value in enumerate(row):
-                index = self._model.index(start_row + r, start_col + c)
-                if index.isValid():
-                    self._model.setData(index, value)
+            for c, value in enumerate(row, start_col):
+                if target_row[c] != value:
+                    edits.append(CellEdit(start_row + r, c, target_row[c], value))
+        self._model.set_cell_values(edits)
         self._resize_row_to_contents(start_row)
 
     def _show_row_header_menu(self, position: QtCore.QPoint) -> None:
@@ -638,8 +746,8 @@ class EditorWidget(QtWidgets.QWidget):
         insert_right = menu.addAction("Insert Column Right")
         rename_col = menu.addAction("Rename Column")
         delete_col = menu.addAction("Delete Column")
-        insert_left.triggered.connect(lambda: self._insert_col_at(col))
-        insert_right.triggered.connect(lambda: self._insert_col_at(col + 1))
+        insert_left.triggered.connect(lambda: self._insert_named_column(col))
+        insert_right.triggered.connect(lambda: self._insert_named_column(col + 1))
         rename_col.triggered.connect(lambda: self._rename_column_at(col))
         delete_col.triggered.connect(lambda: self._delete_col_at(col))
         rename_col.setEnabled(col >= 0)
@@ -655,13 +763,6 @@ class EditorWidget(QtWidgets.QWidget):
             return
         self._model.removeRows(row, 1)
 
-    def _insert_col_at(self, col: int) -> None:
-        col = max(0, min(col, len(self._document.header)))
-        self._model.insertColumns(col, 1)
-        if col < len(self._document.header):
-            self._document.header[col] = self._generate_column_name()
-            self._model.headerDataChanged.emit(QtCore.Qt.Orientation.Horizontal, col, col)
-
     def _delete_col_at(self, col: int) -> None:
         if col < 0 or col >= len(self._document.header):
             return
@@ -680,7 +781,7 @@ class EditorWidget(QtWidgets.QWidget):
             self._on_model_changed()
 
     def sync_from_code_view(self) -> bool:
-        if self._stack.currentIndex() != 1:
+        if self._stack.currentIndex() != 1 or self._serialize_pending:
             return True
         text = self._code_edit.toPlainText()
         try:
@@ -689,10 +790,8 @@ class EditorWidget(QtWidgets.QWidget):
             QtWidgets.QMessageBox.warning(self, "CSV Parse Error", str(exc))
             return False
         if parsed is not None:
-            self._document = parsed
-            self._model.set_document(parsed)
-            self._push_history()
-            self._dirty = True
+            self._replace_contents(parsed)
+            self._set_dirty_flag(True)
         return True
 
     def _grid_match(self, value: str, text: str, case_sensitive: bool) -> bool:
@@ -710,16 +809,18 @@ class EditorWidget(QtWidgets.QWidget):
     ) -> tuple[str, int]:
         if not find_text:
             return value, 0
-        flags = 0 if case_sensitive else re.IGNORECASE
-        pattern = re.escape(find_text)
-        return re.subn(pattern, lambda _match: replace_text, value, count=count, flags=flags)
+        pattern = _find_pattern(find_text, case_sensitive)
+        return pattern.subn(lambda _match: replace_text, value, count=count)
 
-    def _iter_cells(self):
-        rows = len(self._document.rows)
-        cols = len(self._document.header)
-        for row in range(rows):
-            for col in range(cols):
-                yield row, col
+    def _invalidate_search_lines(self) -> None:
+        self._lowered_lines = None
+
+    def _search_lines(self, case_sensitive: bool) -> List[str]:
+        if case_sensitive:
+            return ["\0".join(row) for row in self._document.rows]
+        if self._lowered_lines is None:
+            self._lowered_lines = ["\0".join(row).lower() for row in self._document.rows]
+        return self._lowered_lines
 
     def _cell_text(self, row: int, col: int) -> str:
         index = self._model.index(row, col)
@@ -751,21 +852,20 @@ class EditorWidget(QtWidgets.QWidget):
             return False
         if not self._activate_grid_view():
             return False
-        rows = len(self._document.rows)
+        rows = self._document.rows
         cols = len(self._document.header)
-        if rows == 0 or cols == 0:
+        if not rows or cols == 0:
             return False
         current = self._table_view.selectionModel().currentIndex()
         start = 0
         if current.isValid():
             start = current.row() * cols + current.column() + 1
-        total = rows * cols
+        total = len(rows) * cols
+        needle = text if case_sensitive else text.lower()
         for offset in range(total):
-            idx = (start + offset) % total
-            row = idx // cols
-            col = idx % cols
-            value = self._cell_text(row, col)
-            if self._grid_match(value, text, case_sensitive):
+            row, col = divmod((start + offset) % total, cols)
+            value = rows[row][col]
+            if needle in (value if case_sensitive else value.lower()):
                 self.select_cell(row, col)
                 return True
         return False
@@ -775,11 +875,17 @@ class EditorWidget(QtWidgets.QWidget):
             return []
         if not self._activate_grid_view():
             return []
+        needle = text if case_sensitive else text.lower()
         results: List[tuple[int, int, str]] = []
-        for row, col in self._iter_cells():
-            value = self._cell_text(row, col)
-            if self._grid_match(value, text, case_sensitive):
-                results.append((row, col, value))
+        lines = self._search_lines(case_sensitive)
+        for r, row in enumerate(self._document.rows):
+            if needle not in lines[r]:
+                continue
+            results.extend(
+                (r, c, value)
+                for c, value in enumerate(row)
+                if needle in (value if case_sensitive else value.lower())
+            )
         return results
 
     def replace_current_in_grid(
@@ -821,14 +927,20 @@ class EditorWidget(QtWidgets.QWidget):
         if not self._activate_grid_view():
             return 0
         count = 0
-        for row, col in self._iter_cells():
-            value = self._cell_text(row, col)
-            if self._grid_match(value, find_text, case_sensitive):
-                index = self._model.index(row, col)
+        edits: List[CellEdit] = []
+        needle = find_text if case_sensitive else find_text.lower()
+        lines = self._search_lines(case_sensitive)
+        for r, row in enumerate(self._document.rows):
+            if needle not in lines[r]:
+                continue
+            for c, value in enumerate(row):
+                if needle not in (value if case_sensitive else value.lower()):
+                    continue
                 new_value, num = self._grid_replace(
                     value, find_text, replace_text, case_sensitive
                 )
                 if num:
-                    self._model.setData(index, new_value)
+                    edits.append(CellEdit(r, c, value, new_value))
                     count += num
+        self._model.set_cell_values(edits)
         return count
@@ -1,4 +1,4 @@
-from typing import Optional, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
 from PyQt6 import QtCore, QtWidgets
 
@@ -8,6 +8,39 @@ if TYPE_CHECKING:
     from csv_ide.windows.main_window import MainWindow
 
 
+class FindResultsModel(QtCore.QAbstractListModel):
+    def __init__(self, parent: Optional[QtCore.QObject] = None) -> None:
+        super().__init__(parent)
+        self._matches: List[tuple[int, int, str]] = []
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._matches)
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col, value = self._matches[index.row()]
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            preview = _ellipsize(" ".join(value.split()), 40)
+            return f"Row {row + 1}, Col {col + 1}: {preview}"
+        if role == QtCore.Qt.ItemDataRole.UserRole:
+            return (row, col)
+        return None
+
+    def set_matches(self, matches: List[tuple[int, int, str]]) -> None:
+        self.beginResetModel()
+        self._matches = matches
+        self.endResetModel()
+
+
+def _ellipsize(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit - 1]}…"
+
+
 class FindPanel(QtWidgets.QWidget):
     def __init__(self, parent: "MainWindow") -> None:
         super().__init__(parent)
@@ -28,7 +61,11 @@ class FindPanel(QtWidgets.QWidget):
         form.addWidget(self._find_next_btn, 2, 0)
         form.addWidget(self._find_all_btn, 2, 1)
 
-        self._results = QtWidgets.QListWidget(self)
+        self._results_model = FindResultsModel(self)
+        self._results = QtWidgets.QListView(self)
+        self._results.setModel(self._results_model)
+        self._results.setUniformItemSizes(True)
+        self._results.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
         self._results.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.SingleSelection)
 
         layout.addLayout(form)
@@ -36,7 +73,7 @@ class FindPanel(QtWidgets.QWidget):
 
         self._find_next_btn.clicked.connect(self._on_find_next)
         self._find_all_btn.clicked.connect(self._on_find_all)
-        self._results.itemDoubleClicked.connect(self._on_result_activated)
+        self._results.doubleClicked.connect(self._on_result_activated)
 
     def focus_input(self) -> None:
         self._find_input.setFocus()
@@ -57,27 +94,16 @@ class FindPanel(QtWidgets.QWidget):
         editor = self._current_editor()
         if not editor:
             return
-        self._results.clear()
         matches = editor.find_all_in_grid(self._find_input.text(), self._case_check.isChecked())
-        for row, col, value in matches:
-            preview = " ".join(value.split())
-            preview = self._ellipsize(preview, 40)
-            item = QtWidgets.QListWidgetItem(f"Row {row + 1}, Col {col + 1}: {preview}")
-            item.setData(QtCore.Qt.ItemDataRole.UserRole, (row, col))
-            self._results.addItem(item)
+        self._results_model.set_matches(matches)
         if not matches:
             QtWidgets.QMessageBox.information(self, "Find All", "No matches found.")
 
-    def _on_result_activated(self, item: QtWidgets.QListWidgetItem) -> None:
+    def _on_result_activated(self, index: QtCore.QModelIndex) -> None:
         editor = self._current_editor()
         if not editor:
             return
-        data = item.data(QtCore.Qt.ItemDataRole.UserRole)
+        data = index.data(QtCore.Qt.ItemDataRole.UserRole)
         if isinstance(data, tuple) and len(data) == 2:
             row, col = data
             editor.select_cell(row, col)
-
-    def _ellipsize(self, text: str, limit: int) -> str:
-        if len(text) <= limit:
-            return text
-        return f"{text[:limit - 1]}…"
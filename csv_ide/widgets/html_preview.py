@@ -1,12 +1,46 @@
+import hashlib
 import html
 import json
 import re
+from collections import OrderedDict, deque
 from typing import Optional
 
 from PyQt6 import QtCore, QtGui, QtWebEngineWidgets, QtWidgets
 
+from csv_ide.settings import app_settings
 from csv_ide.theme import theme_palette
 
+_GRAPH_CACHE_SIZE = 128
+_BODY_MARKER = "\0body\0"
+_GRAPH_STARTERS = frozenset({"graph", "flowchart"})
+
+
+class _GraphRenderSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(int, str, str)
+
+
+class _GraphRenderTask(QtCore.QRunnable):
+    def __init__(
+        self,
+        generation: int,
+        key: str,
+        source: str,
+        colors: dict[str, str],
+        layout_map: dict[str, dict[str, float]],
+        signals: _GraphRenderSignals,
+    ) -> None:
+        super().__init__()
+        self._generation = generation
+        self._key = key
+        self._source = source
+        self._colors = colors
+        self._layout_map = layout_map
+        self._signals = signals
+
+    def run(self) -> None:
+        svg = _render_simple_graph(self._source, self._colors, self._layout_map)
+        self._signals.finished.emit(self._generation, self._key, svg)
+
 
 class HtmlPreviewWindow(QtWidgets.QMainWindow):
     def __init__(
@@ -24,6 +58,19 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
         self._layout_path = layout_path
         self._layout_map: dict[str, dict[str, float]] = {}
         self._closing_for_layout = False
+        self._graph_cache: OrderedDict[str, str] = OrderedDict()
+        self._graph_signals = _GraphRenderSignals()
+        self._graph_signals.finished.connect(self._on_graph_rendered)
+        self._graph_generation = 0
+        self._pending_graph_key: Optional[str] = None
+        self._last_html: Optional[str] = None
+        self._shell_colors: Optional[dict[str, str]] = None
+        self._shell_parts: Optional[tuple[dict[str, str], str, str]] = None
+        self._page_loaded = False
+        self._render_timer = QtCore.QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setInterval(200)
+        self._render_timer.timeout.connect(self._update_preview)
         if self._enable_node_drag and self._layout_path:
             self._layout_map = self._load_layout_map()
 
@@ -33,6 +80,7 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
         self._code_edit = QtWidgets.QPlainTextEdit(self)
         self._code_edit.setPlaceholderText("Paste HTML here...")
         self._preview = QtWebEngineWidgets.QWebEngineView(self)
+        self._preview.loadFinished.connect(self._on_load_finished)
 
         splitter.addWidget(self._code_edit)
         splitter.addWidget(self._preview)
@@ -40,7 +88,7 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
         splitter.setStretchFactor(1, 1)
         self.setCentralWidget(splitter)
 
-        self._code_edit.textChanged.connect(self._update_preview)
+        self._code_edit.textChanged.connect(self._render_timer.start)
         self._update_preview()
         if not self._show_editor:
             self._code_edit.setVisible(False)
@@ -48,11 +96,46 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
 
     def set_content(self, content: str) -> None:
         self._code_edit.setPlainText(content)
+        self._render_timer.stop()
         self._update_preview()
 
     def _update_preview(self) -> None:
         raw = self._code_edit.toPlainText()
-        self._preview.setHtml(self._build_html(raw))
+        colors = self._theme_colors()
+        content = raw.strip()
+        mermaid_source = self._extract_mermaid_source(content) if content else None
+        if mermaid_source:
+            body = self._cached_graph(mermaid_source, colors)
+            if body is None:
+                # Keep showing the previous graph while the new layout is computed.
+                if self._last_html is not None and "data-graph=" in self._last_html:
+                    return
+                body = "<p>Rendering graph...</p>"
+        else:
+            body = self._build_body(raw)
+        page = raw.strip() if body is None else self._build_html(body, colors)
+        if page == self._last_html:
+            return
+        self._last_html = page
+        if body is not None and self._can_patch_body(body, colors):
+            self._preview.page().runJavaScript(
+                f"document.getElementById('pan-zoom').innerHTML = {json.dumps(body)};"
+            )
+            return
+        self._page_loaded = False
+        self._shell_colors = None if body is None else colors
+        self._preview.setHtml(page)
+
+    def _on_load_finished(self, ok: bool) -> None:
+        self._page_loaded = ok
+
+    def _can_patch_body(self, body: str, colors: dict[str, str]) -> bool:
+        return (
+            self._page_loaded
+            and not self._enable_node_drag
+            and self._shell_colors == colors
+            and "<script" not in body.lower()
+        )
 
     def _load_layout_map(self) -> dict[str, dict[str, float]]:
         if not self._layout_path:
@@ -105,24 +188,24 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
             "window.__graphLayout && window.__graphLayout()", _on_layout
         )
 
-    def _build_html(self, raw: str) -> str:
+    def _build_body(self, raw: str) -> Optional[str]:
         content = raw.strip()
-        colors = self._theme_colors()
         if not content:
-            body = "<p>Paste HTML to preview it here.</p>"
-        else:
-            mermaid_source = self._extract_mermaid_source(content)
-            if mermaid_source:
-                body = self._render_simple_graph(mermaid_source)
-            else:
-                lower = content.lower()
-                if "<html" in lower or "<!doctype" in lower:
-                    return content
-                looks_like_html = re.search(r"</?[a-zA-Z][\s>]", content) is not None
-                if looks_like_html:
-                    body = content
-                else:
-                    body = f"<pre>{html.escape(raw)}</pre>"
+            return "<p>Paste HTML to preview it here.</p>"
+        lower = content.lower()
+        if "<html" in lower or "<!doctype" in lower:
+            return None
+        if re.search(r"</?[a-zA-Z][\s>]", content) is not None:
+            return content
+        return f"<pre>{html.escape(raw)}</pre>"
+
+    def _build_html(self, body: str, colors: dict[str, str]) -> str:
+        if self._shell_parts is None or self._shell_parts[0] != colors:
+            head, tail = self._build_shell(colors).split(_BODY_MARKER)
+            self._shell_parts = (dict(colors), head, tail)
+        return self._shell_parts[1] + body + self._shell_parts[2]
+
+    def _build_shell(self, colors: dict[str, str]) -> str:
         return f"""<!doctype html>
 <html>
   <head>
@@ -141,7 +224,7 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
   <body>
     <div id="canvas">
       <div id="pan-zoom">
-        {body}
+        {_BODY_MARKER}
       </div>
     </div>
     <script>
@@ -208,21 +291,54 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
   </body>
 </html>"""
 
+    def _cached_graph(self, source: str, colors: dict[str, str]) -> Optional[str]:
+        key = hashlib.blake2b(
+            f"{colors['window']}\0{source}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+        svg = self._graph_cache.get(key)
+        if svg is not None:
+            self._graph_cache.move_to_end(key)
+            return svg
+        if key != self._pending_graph_key:
+            self._graph_generation += 1
+            self._pending_graph_key = key
+            layout_map = dict(self._layout_map) if self._enable_node_drag else {}
+            QtCore.QThreadPool.globalInstance().start(
+                _GraphRenderTask(
+                    self._graph_generation,
+                    key,
+                    source,
+                    dict(colors),
+                    layout_map,
+                    self._graph_signals,
+                )
+            )
+        return None
+
+    def _on_graph_rendered(self, generation: int, key: str, svg: str) -> None:
+        self._graph_cache[key] = svg
+        if len(self._graph_cache) > _GRAPH_CACHE_SIZE:
+            self._graph_cache.popitem(last=False)
+        if generation != self._graph_generation:
+            return
+        self._pending_graph_key = None
+        self._update_preview()
+
     def _extract_mermaid_source(self, content: str) -> Optional[str]:
         lower = content.lower()
         if "class=\"mermaid\"" in lower:
             match = re.search(r"<pre\\s+class=\\\"mermaid\\\"[^>]*>(.*?)</pre>", content, re.S)
             if match:
                 return match.group(1).strip()
-        for starter in ("graph ", "flowchart "):
-            if lower.startswith(starter):
-                return content
+        # Only the leading keyword matters; slicing keeps split from copying the document.
+        if lower[:16].split(None, 1)[0] in _GRAPH_STARTERS:
+            return content
         if "-->" in content and "graph" in lower:
             return content
         return None
 
     def _theme_colors(self) -> dict[str, str]:
-        settings = QtCore.QSettings("RussellCsv", "RussellCsv")
+        settings = app_settings()
         name = settings.value("ui_theme", "light", type=str)
         palette = theme_palette(name)
         if name == "dark":
@@ -261,6 +377,19 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
         }
         const nodes = Array.from(svg.querySelectorAll("g[data-node]"));
         const edges = Array.from(svg.querySelectorAll("path[data-src]"));
+        const nodeById = new Map(nodes.map((node) => [node.dataset.node, node]));
+        const edgesByNode = new Map();
+        edges.forEach((edge) => {
+          [edge.dataset.src, edge.dataset.dst].forEach((name) => {
+            if (!edgesByNode.has(name)) {
+              edgesByNode.set(name, []);
+            }
+            const attached = edgesByNode.get(name);
+            if (attached[attached.length - 1] !== edge) {
+              attached.push(edge);
+            }
+          });
+        });
         const direction = (svg.getAttribute("data-direction") || "TD").toUpperCase();
 
         function getRect(node) {
@@ -296,12 +425,9 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
         }
 
         function updateEdgesFor(nodeName) {
-          edges.forEach((edge) => {
-            if (edge.dataset.src !== nodeName && edge.dataset.dst !== nodeName) {
-              return;
-            }
-            const srcNode = svg.querySelector("g[data-node='" + edge.dataset.src + "']");
-            const dstNode = svg.querySelector("g[data-node='" + edge.dataset.dst + "']");
+          (edgesByNode.get(nodeName) || []).forEach((edge) => {
+            const srcNode = nodeById.get(edge.dataset.src);
+            const dstNode = nodeById.get(edge.dataset.dst);
             if (!srcNode || !dstNode) {
               return;
             }
@@ -313,8 +439,8 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
 
         function updateAllEdges() {
           edges.forEach((edge) => {
-            const srcNode = svg.querySelector("g[data-node='" + edge.dataset.src + "']");
-            const dstNode = svg.querySelector("g[data-node='" + edge.dataset.dst + "']");
+            const srcNode = nodeById.get(edge.dataset.src);
+            const dstNode = nodeById.get(edge.dataset.dst);
             if (!srcNode || !dstNode) {
               return;
             }
@@ -376,211 +502,216 @@ class HtmlPreviewWindow(QtWidgets.QMainWindow):
     </script>
         """
 
-    def _render_simple_graph(self, source: str) -> str:
-        lines = [line.strip() for line in source.splitlines() if line.strip()]
-        direction = "TD"
-        if lines:
-            first = lines[0].lower()
-            if first.startswith("graph "):
-                direction = first.split(" ", 1)[1].strip().upper()
-                lines = lines[1:]
-            elif first.startswith("flowchart "):
-                direction = first.split(" ", 1)[1].strip().upper()
-                lines = lines[1:]
-        edges: list[tuple[str, str, str]] = []
-        nodes: list[str] = []
-        for line in lines:
-            if line.startswith("%%"):
-                continue
-            match = re.match(r"(.+?)-->(.+)", line)
-            if not match:
-                continue
-            left = match.group(1).strip()
-            right = match.group(2).strip()
-            label = ""
-            if right.startswith("|") and "|" in right[1:]:
-                label, right = right[1:].split("|", 1)
-                right = right.strip()
-                label = label.strip()
-            left = left.strip()
-            right = right.strip()
-            if not left or not right:
-                continue
-            if left not in nodes:
-                nodes.append(left)
-            if right not in nodes:
-                nodes.append(right)
-            edges.append((left, right, label))
-        if not nodes:
-            return "<p>No supported graph lines found.</p>"
-
-        indegree: dict[str, int] = {node: 0 for node in nodes}
-        outgoing: dict[str, list[str]] = {node: [] for node in nodes}
-        for src, dst, _ in edges:
-            outgoing[src].append(dst)
-            indegree[dst] += 1
-
-        layers: dict[str, int] = {}
-        queue = [node for node in nodes if indegree[node] == 0]
-        order = list(queue)
-        while queue:
-            current = queue.pop(0)
-            base = layers.get(current, 0)
-            for nxt in outgoing[current]:
-                layers[nxt] = max(layers.get(nxt, 0), base + 1)
-                indegree[nxt] -= 1
-                if indegree[nxt] == 0:
-                    queue.append(nxt)
-                    order.append(nxt)
-        if len(order) != len(nodes):
-            order = nodes[:]
-            for idx, node in enumerate(order):
-                layers[node] = layers.get(node, idx)
-
-        grouped: dict[int, list[str]] = {}
-        for node in order:
-            layer = layers.get(node, 0)
-            grouped.setdefault(layer, []).append(node)
-
-        node_width = 320
-        node_height = 96
-        x_gap = 190
-        y_gap = 120
-        padding = 60
-
-        positions: dict[str, tuple[int, int]] = {}
-        max_primary = max(grouped.keys())
-        max_secondary = max(len(items) for items in grouped.values())
-        for layer, items in grouped.items():
-            for idx, node in enumerate(items):
-                if direction in {"LR", "RL"}:
-                    x = padding + layer * (node_width + x_gap)
-                    y = padding + idx * (node_height + y_gap)
-                else:
-                    x = padding + idx * (node_width + x_gap)
-                    y = padding + layer * (node_height + y_gap)
-                positions[node] = (x, y)
 
-        if direction in {"LR", "RL"}:
-            width = padding * 2 + (max_primary + 1) * node_width + max_primary * x_gap
-            height = padding * 2 + max_secondary * node_height + max(0, max_secondary - 1) * y_gap
-        else:
-            width = padding * 2 + max_secondary * node_width + max(0, max_secondary - 1) * x_gap
-            height = padding * 2 + (max_primary + 1) * node_height + max_primary * y_gap
-
-        def esc(value: str) -> str:
-            return html.escape(value, quote=True)
-
-        colors = self._theme_colors()
-        if colors["window"] == "#121416":
-            palette = [
-                ("#23282C", "#3C8BC8"),
-                ("#2A2E33", "#C88D3B"),
-                ("#2B332E", "#57A374"),
-                ("#2E2730", "#C77A9A"),
-            ]
-        else:
-            palette = [
-                ("#FFF3E0", "#E1A24C"),
-                ("#EAF2FF", "#6C8DC8"),
-                ("#ECF8EC", "#67A470"),
-                ("#FDEBF2", "#C96E8C"),
-            ]
-
-        def node_lines(text: str) -> list[str]:
-            if " (" in text and text.endswith(")"):
-                left, right = text[:-1].split(" (", 1)
-                return [left, right]
-            if "\\n" in text:
-                return [part for part in text.split("\\n") if part]
-            return [text]
-
-        if self._enable_node_drag and self._layout_map:
-            for node, coords in self._layout_map.items():
-                if node in positions:
-                    positions[node] = (coords.get("x", positions[node][0]), coords.get("y", positions[node][1]))
-
-        node_ids = {node: f"node-{idx}" for idx, node in enumerate(nodes)}
-
-        svg_parts = [
-            f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
-            f'data-graph="relation" data-direction="{direction}" '
-            'xmlns="http://www.w3.org/2000/svg">',
-            "<defs>",
-            '<marker id="arrow" markerWidth="10" markerHeight="10" refX="9" refY="5" '
-            'orient="auto" markerUnits="strokeWidth"><path d="M 0 0 L 10 5 L 0 10 z" '
-            f'fill="{colors["edge"]}"/></marker>',
-            '<filter id="shadow" x="-20%" y="-20%" width="140%" height="140%">'
-            '<feDropShadow dx="0" dy="3" stdDeviation="6" flood-color="#2b2b2b" flood-opacity="0.15"/>'
-            "</filter>",
-            "</defs>",
-        ]
-        for src, dst, label in edges:
-            x1, y1 = positions[src]
-            x2, y2 = positions[dst]
-            start_x = x1 + node_width
-            start_y = y1 + node_height / 2
-            end_x = x2
-            end_y = y2 + node_height / 2
-            if direction in {"TD", "TB"}:
-                start_x = x1 + node_width / 2
-                start_y = y1 + node_height
-                end_x = x2 + node_width / 2
-                end_y = y2
+def _render_simple_graph(
+    source: str, colors: dict[str, str], layout_map: dict[str, dict[str, float]]
+) -> str:
+    lines = [line.strip() for line in source.splitlines() if line.strip()]
+    direction = "TD"
+    if lines:
+        first = lines[0].lower()
+        if first.startswith("graph "):
+            direction = first.split(" ", 1)[1].strip().upper()
+            lines = lines[1:]
+        elif first.startswith("flowchart "):
+            direction = first.split(" ", 1)[1].strip().upper()
+            lines = lines[1:]
+    edges: list[tuple[str, str, str]] = []
+    node_order: dict[str, None] = {}
+    for line in lines:
+        if line.startswith("%%"):
+            continue
+        match = re.match(r"(.+?)-->(.+)", line)
+        if not match:
+            continue
+        left = match.group(1).strip()
+        right = match.group(2).strip()
+        label = ""
+        if right.startswith("|") and "|" in right[1:]:
+            label, right = right[1:].split("|", 1)
+            right = right.strip()
+            label = label.strip()
+        left = left.strip()
+        right = right.strip()
+        if not left or not right:
+            continue
+        node_order.setdefault(left)
+        node_order.setdefault(right)
+        edges.append((left, right, label))
+    nodes = list(node_order)
+    if not nodes:
+        return "<p>No supported graph lines found.</p>"
+
+    indegree: dict[str, int] = {node: 0 for node in nodes}
+    outgoing: dict[str, list[str]] = {node: [] for node in nodes}
+    for src, dst, _ in edges:
+        outgoing[src].append(dst)
+        indegree[dst] += 1
+
+    layers: dict[str, int] = {}
+    queue = deque(node for node in nodes if indegree[node] == 0)
+    order = list(queue)
+    while queue:
+        current = queue.popleft()
+        base = layers.get(current, 0)
+        for nxt in outgoing[current]:
+            layers[nxt] = max(layers.get(nxt, 0), base + 1)
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                queue.append(nxt)
+                order.append(nxt)
+    if len(order) != len(nodes):
+        order = nodes[:]
+        for idx, node in enumerate(order):
+            layers[node] = layers.get(node, idx)
+
+    grouped: dict[int, list[str]] = {}
+    for node in order:
+        layer = layers.get(node, 0)
+        grouped.setdefault(layer, []).append(node)
+
+    node_width = 320
+    node_height = 96
+    x_gap = 190
+    y_gap = 120
+    padding = 60
+
+    positions: dict[str, tuple[int, int]] = {}
+    max_primary = max(grouped.keys())
+    max_secondary = max(len(items) for items in grouped.values())
+    for layer, items in grouped.items():
+        for idx, node in enumerate(items):
             if direction in {"LR", "RL"}:
-                mid_x = (start_x + end_x) / 2
-                path = (
-                    f"M {start_x} {start_y} C {mid_x} {start_y}, "
-                    f"{mid_x} {end_y}, {end_x} {end_y}"
-                )
+                x = padding + layer * (node_width + x_gap)
+                y = padding + idx * (node_height + y_gap)
             else:
-                mid_y = (start_y + end_y) / 2
-                path = (
-                    f"M {start_x} {start_y} C {start_x} {mid_y}, "
-                    f"{end_x} {mid_y}, {end_x} {end_y}"
-                )
-            svg_parts.append(
-                f'<path d="{path}" stroke="{colors["edge"]}" stroke-width="2.2" fill="none" '
-                f'data-src="{node_ids[src]}" data-dst="{node_ids[dst]}" '
-                'marker-end="url(#arrow)" />'
-            )
-            if label:
-                label_x = (start_x + end_x) / 2
-                label_y = (start_y + end_y) / 2 - 6
-                svg_parts.append(
-                    f'<text x="{label_x}" y="{label_y}" font-size="15" '
-                    f'fill="{colors["edge_text"]}" text-anchor="middle">{esc(label)}</text>'
-                )
+                x = padding + idx * (node_width + x_gap)
+                y = padding + layer * (node_height + y_gap)
+            positions[node] = (x, y)
+
+    if direction in {"LR", "RL"}:
+        width = padding * 2 + (max_primary + 1) * node_width + max_primary * x_gap
+        height = padding * 2 + max_secondary * node_height + max(0, max_secondary - 1) * y_gap
+    else:
+        width = padding * 2 + max_secondary * node_width + max(0, max_secondary - 1) * x_gap
+        height = padding * 2 + (max_primary + 1) * node_height + max_primary * y_gap
+
+    def esc(value: str) -> str:
+        return html.escape(value, quote=True)
+
+    if colors["window"] == "#121416":
+        palette = [
+            ("#23282C", "#3C8BC8"),
+            ("#2A2E33", "#C88D3B"),
+            ("#2B332E", "#57A374"),
+            ("#2E2730", "#C77A9A"),
+        ]
+    else:
+        palette = [
+            ("#FFF3E0", "#E1A24C"),
+            ("#EAF2FF", "#6C8DC8"),
+            ("#ECF8EC", "#67A470"),
+            ("#FDEBF2", "#C96E8C"),
+        ]
 
-        for node, (x, y) in positions.items():
-            fill, stroke = palette[layers.get(node, 0) % len(palette)]
-            label_attr = esc(node)
-            node_id = node_ids[node]
-            svg_parts.append(
-                f'<g data-node="{node_id}" data-label="{label_attr}" data-x="{x}" '
-                f'data-y="{y}" data-width="{node_width}" data-height="{node_height}" '
-                f'transform="translate({x} {y})">'
+    def node_lines(text: str) -> list[str]:
+        if " (" in text and text.endswith(")"):
+            left, right = text[:-1].split(" (", 1)
+            return [left, right]
+        if "\\n" in text:
+            return [part for part in text.split("\\n") if part]
+        return [text]
+
+    if layout_map:
+        for node, coords in layout_map.items():
+            if node in positions:
+                positions[node] = (coords.get("x", positions[node][0]), coords.get("y", positions[node][1]))
+
+    node_ids = {node: f"node-{idx}" for idx, node in enumerate(nodes)}
+
+    svg_parts = [
+        f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
+        f'data-graph="relation" data-direction="{direction}" '
+        'xmlns="http://www.w3.org/2000/svg">',
+        "<defs>",
+        '<marker id="arrow" markerWidth="10" markerHeight="10" refX="9" refY="5" '
+        'orient="auto" markerUnits="strokeWidth"><path d="M 0 0 L 10 5 L 0 10 z" '
+        f'fill="{colors["edge"]}"/></marker>',
+        '<filter id="shadow" x="-20%" y="-20%" width="140%" height="140%">'
+        '<feDropShadow dx="0" dy="3" stdDeviation="6" flood-color="#2b2b2b" flood-opacity="0.15"/>'
+        "</filter>",
+        "</defs>",
+    ]
+    for src, dst, label in edges:
+        x1, y1 = positions[src]
+        x2, y2 = positions[dst]
+        start_x = x1 + node_width
+        start_y = y1 + node_height / 2
+        end_x = x2
+        end_y = y2 + node_height / 2
+        if direction in {"TD", "TB"}:
+            start_x = x1 + node_width / 2
+            start_y = y1 + node_height
+            end_x = x2 + node_width / 2
+            end_y = y2
+        if direction in {"LR", "RL"}:
+            mid_x = (start_x + end_x) / 2
+            path = (
+                f"M {start_x} {start_y} C {mid_x} {start_y}, "
+                f"{mid_x} {end_y}, {end_x} {end_y}"
             )
-            svg_parts.append(
-                f'<rect x="0" y="0" width="{node_width}" height="{node_height}" '
-                f'rx="22" ry="22" fill="{fill}" stroke="{stroke}" '
-                'stroke-width="1.6" filter="url(#shadow)" />'
+        else:
+            mid_y = (start_y + end_y) / 2
+            path = (
+                f"M {start_x} {start_y} C {start_x} {mid_y}, "
+                f"{end_x} {mid_y}, {end_x} {end_y}"
             )
-            lines = node_lines(node)
-            line_height = 18
-            block_height = line_height * len(lines)
-            start_y = (node_height - block_height) / 2 + line_height - 3
+        svg_parts.append(
+            f'<path d="{path}" stroke="{colors["edge"]}" stroke-width="2.2" fill="none" '
+            f'data-src="{node_ids[src]}" data-dst="{node_ids[dst]}" '
+            'marker-end="url(#arrow)" />'
+        )
+        if label:
+            label_x = (start_x + end_x) / 2
+            label_y = (start_y + end_y) / 2 - 6
             svg_parts.append(
-                f'<text x="{node_width / 2}" y="{start_y}" '
-                f'font-size="16" fill="{colors["text"]}" text-anchor="middle">'
+                f'<text x="{label_x}" y="{label_y}" font-size="15" '
+                f'fill="{colors["edge_text"]}" text-anchor="middle">{esc(label)}</text>'
             )
+
+    line_height = 18
+    text_x = node_width / 2
+    text_style = f'font-size="16" fill="{colors["text"]}" text-anchor="middle"'
+    for node, (x, y) in positions.items():
+        fill, stroke = palette[layers.get(node, 0) % len(palette)]
+        label_attr = esc(node)
+        node_id = node_ids[node]
+        svg_parts.append(
+            f'<g data-node="{node_id}" data-label="{label_attr}" data-x="{x}" '
+            f'data-y="{y}" data-width="{node_width}" data-height="{node_height}" '
+            f'transform="translate({x} {y})">'
+        )
+        svg_parts.append(
+            f'<rect x="0" y="0" width="{node_width}" height="{node_height}" '
+            f'rx="22" ry="22" fill="{fill}" stroke="{stroke}" '
+            'stroke-width="1.6" filter="url(#shadow)" />'
+        )
+        lines = node_lines(node)
+        block_height = line_height * len(lines)
+        start_y = (node_height - block_height) / 2 + line_height - 3
+        text_open = f'<text x="{text_x}" y="{start_y}" {text_style}>'
+        if len(lines) == 1:
+            # A single line needs no tspan; the text element already sits on its baseline.
+            svg_parts.append(f"{text_open}{esc(lines[0])}</text>")
+        else:
+            svg_parts.append(text_open)
             for idx, line in enumerate(lines):
                 dy = idx * line_height
                 svg_parts.append(
-                    f'<tspan x="{node_width / 2}" y="{start_y + dy}">'
+                    f'<tspan x="{text_x}" y="{start_y + dy}">'
                     f"{esc(line)}</tspan>"
                 )
             svg_parts.append("</text>")
-            svg_parts.append("</g>")
-        svg_parts.append("</svg>")
-        return "\n".join(svg_parts)
+        svg_parts.append("</g>")
+    svg_parts.append("</svg>")
+    return "\n".join(svg_parts)
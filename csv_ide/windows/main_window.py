@@ -1,18 +1,22 @@
 import csv
 import json
+import operator
 import os
 import re
-import shlex
 import shutil
 import subprocess
 import sys
+import tempfile
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterable, Optional
 
 from PyQt6 import QtCore, QtGui, QtWidgets
 
-from csv_ide.models import CsvDocument
-from csv_ide.theme import apply_theme
+from csv_ide.models import CsvDocument, parse_csv_file, serialize_csv_document
+from csv_ide.settings import app_settings
+from csv_ide.theme import apply_theme, stylesheet_cache_path
 from csv_ide.widgets.cell_detail import CellDetailPanel
 from csv_ide.widgets.editor import EditorWidget
 from csv_ide.widgets.find_panel import FindPanel
@@ -21,16 +25,118 @@ from csv_ide.widgets.replace_dialog import ReplaceDialog
 from csv_ide.widgets.relation_editor_dialog import RelationEditorDialog
 from csv_ide.widgets.safe_mode_dialog import SafeModeDialog
 
+_USER_ROLE = QtCore.Qt.ItemDataRole.UserRole
+_TABLE_SUFFIXES = (".csv", ".tsv")
+_TABLE_SUFFIX_SET = frozenset(_TABLE_SUFFIXES)
+_SKIP_SCAN_DIRS = frozenset({"node_modules", "__pycache__", "venv"})
+_ASYNC_LOAD_BYTES = 1 << 20
+_FILE_BUFFER_BYTES = 1 << 20
+_EDITOR_POOL_SIZE = 8
+_DIR_MTIME_SLACK_NS = 2_000_000_000
+
+
+def _table_suffix(path: str) -> str:
+    return os.path.splitext(path)[1].lower()
+
+
+def _is_table_path(path: str) -> bool:
+    return _table_suffix(path) in _TABLE_SUFFIX_SET
+
+
+def _delimiter_for_path(path: str) -> str:
+    return "\t" if _table_suffix(path) == ".tsv" else ","
+
+
+def _load_csv_document(path: str, delimiter: str) -> CsvDocument:
+    with open(
+        path, "r", encoding="utf-8", newline="", buffering=_FILE_BUFFER_BYTES
+    ) as handle:
+        return parse_csv_file(handle, path, delimiter)
+
+
+def _write_text_in_place(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8", newline="", buffering=_FILE_BUFFER_BYTES) as handle:
+        handle.write(text)
+
+
+def _write_text_atomic(path: str, text: str) -> None:
+    target = os.path.realpath(path)
+    if not os.path.exists(target):
+        _write_text_in_place(target, text)
+        return
+    # Replacing an existing file goes through a sibling temp file so a failed write
+    # never leaves the original truncated.
+    directory, name = os.path.split(target)
+    try:
+        fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    except PermissionError:
+        # A writable file in a read-only directory can still be saved, just not atomically.
+        _write_text_in_place(target, text)
+        return
+    try:
+        with open(
+            fd, "w", encoding="utf-8", newline="", buffering=_FILE_BUFFER_BYTES
+        ) as handle:
+            handle.write(text)
+        shutil.copymode(target, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class _LoadSignals(QtCore.QObject):
+    loaded = QtCore.pyqtSignal(str, object)
+    parse_failed = QtCore.pyqtSignal(str, str, str)
+    failed = QtCore.pyqtSignal(str, str)
+
+
+class _LoadTask(QtCore.QRunnable):
+    def __init__(self, path: str, delimiter: str, signals: _LoadSignals) -> None:
+        super().__init__()
+        self._path = path
+        self._delimiter = delimiter
+        self._signals = signals
+
+    def run(self) -> None:
+        try:
+            document = _load_csv_document(self._path, self._delimiter)
+        except (ValueError, csv.Error) as exc:
+            try:
+                with open(self._path, "r", encoding="utf-8", newline="") as handle:
+                    raw_text = handle.read()
+            except (OSError, ValueError) as read_exc:
+                self._signals.failed.emit(self._path, str(read_exc))
+                return
+            self._signals.parse_failed.emit(self._path, raw_text, str(exc))
+            return
+        except OSError as exc:
+            self._signals.failed.emit(self._path, str(exc))
+            return
+        self._signals.loaded.emit(self._path, document)
+
 
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self) -> None:
         super().__init__()
         self.setWindowTitle("RussellCsv")
         self.resize(1200, 720)
-        self._settings = QtCore.QSettings("RussellCsv", "RussellCsv")
+        self._settings = app_settings()
         self._theme_name = self._settings.value("ui_theme", "light", type=str)
-        self._plugin_scripts = self._settings.value("plugin_scripts", [], type=list)
+        self._undo_limit = self._settings.value("undo_limit", 1000, type=int)
+        self._plugin_scripts: set[str] = {
+            path
+            for path in self._settings.value("plugin_scripts", [], type=list)
+            if isinstance(path, str)
+        }
         self._plugin_processes: list[QtCore.QProcess] = []
+        self._plugin_worker: Optional[QtCore.QProcess] = None
+        self._plugin_worker_buffer = b""
+        self._plugin_worker_job: Optional[int] = None
+        self._plugin_job_counter = 0
 
         splitter = QtWidgets.QSplitter(self)
         splitter.setOrientation(QtCore.Qt.Orientation.Horizontal)
@@ -77,6 +183,19 @@ class MainWindow(QtWidgets.QMainWindow):
         self._status_bar.showMessage("Ready")
 
         self._open_documents: dict[str, EditorWidget] = {}
+        self._pending_loads: set[str] = set()
+        self._editor_pool: OrderedDict[str, tuple[EditorWidget, float]] = OrderedDict()
+        self._load_signals = _LoadSignals()
+        self._load_signals.loaded.connect(self._on_document_loaded)
+        self._load_signals.parse_failed.connect(self._on_document_parse_failed)
+        self._load_signals.failed.connect(self._on_document_load_failed)
+        self._dirty_editors: set[EditorWidget] = set()
+        self._selected_cell_counts: dict[EditorWidget, int] = {}
+        self._file_list_lowercase: list[str] = []
+        self._file_list_paths: list[str] = []
+        self._file_list_visible_rows: Optional[list[int]] = None
+        self._path_to_list_item: dict[str, QtWidgets.QListWidgetItem] = {}
+        self._file_filter_text = ""
         self._root_path = QtCore.QDir.currentPath()
         self._right_tabs = right_panel
         self._current_path: Optional[str] = None
@@ -91,11 +210,32 @@ class MainWindow(QtWidgets.QMainWindow):
         self._auto_save_debounce_timer.setSingleShot(True)
         self._auto_save_debounce_timer.setInterval(1000)
         self._auto_save_debounce_timer.timeout.connect(self._auto_save_all)
+        self._session_state_timer = QtCore.QTimer(self)
+        self._session_state_timer.setSingleShot(True)
+        self._session_state_timer.setInterval(150)
+        self._session_state_timer.timeout.connect(self._write_session_state)
+        self._status_editor: Optional[EditorWidget] = None
+        self._status_message_before_update = ""
+        self._status_timer = QtCore.QTimer(self)
+        self._status_timer.setSingleShot(True)
+        self._status_timer.setInterval(30)
+        self._status_timer.timeout.connect(self._refresh_status)
+        self._title_editor: Optional[EditorWidget] = None
+        self._title_timer = QtCore.QTimer(self)
+        self._title_timer.setSingleShot(True)
+        self._title_timer.setInterval(0)
+        self._title_timer.timeout.connect(self._refresh_title)
         self._file_watcher = QtCore.QFileSystemWatcher(self)
         self._file_watcher.fileChanged.connect(self._on_watched_file_changed)
         self._file_mtimes: dict[str, float] = {}
+        self._dir_scan_cache: dict[str, tuple[int, list[str], list[str]]] = {}
+        self._relation_tables_cache: Optional[tuple[str, tuple[str, ...], list[str]]] = None
+        self._csv_header_cache: dict[str, tuple[tuple[int, int, str], list[str]]] = {}
         self._file_change_timers: dict[str, QtCore.QTimer] = {}
         self._file_comments = self._load_file_comments()
+        self._file_comments_lowercase = {
+            path: comment.lower() for path, comment in self._file_comments.items()
+        }
         self._build_actions()
         self._root_path = self._settings.value("last_root_path", self._root_path, type=str)
         self._apply_theme(self._theme_name)
@@ -110,7 +250,7 @@ class MainWindow(QtWidgets.QMainWindow):
             app.aboutToQuit.connect(self._auto_save_all)
 
     def _open_from_list(self, item: QtWidgets.QListWidgetItem) -> None:
-        path = item.data(QtCore.Qt.ItemDataRole.UserRole)
+        path = item.data(_USER_ROLE)
         if isinstance(path, str):
             self.open_file(path)
 
@@ -120,7 +260,7 @@ class MainWindow(QtWidgets.QMainWindow):
         item = self._file_list.currentItem()
         if not item:
             return
-        path = item.data(QtCore.Qt.ItemDataRole.UserRole)
+        path = item.data(_USER_ROLE)
         if not isinstance(path, str):
             return
         self._persist_session_state()
@@ -132,37 +272,102 @@ class MainWindow(QtWidgets.QMainWindow):
             self._persist_session_state()
             return
 
-        delimiter = "\t" if path.lower().endswith(".tsv") else ","
+        if path in self._pending_loads:
+            return
+        if self._reuse_pooled_editor(path):
+            return
+        delimiter = _delimiter_for_path(path)
         try:
-            document = self._load_document(path, delimiter)
-            editor = EditorWidget(document, self)
-        except ValueError as exc:
-            try:
-                with open(path, "r", encoding="utf-8", newline="") as handle:
-                    raw_text = handle.read()
-            except OSError as read_exc:
-                QtWidgets.QMessageBox.warning(self, "Open failed", str(read_exc))
-                return
-            document = CsvDocument(path, delimiter, [], [])
-            editor = EditorWidget(document, self, raw_text=raw_text, parse_error=str(exc))
-            self._status_bar.showMessage("CSV parse error. Check the Code view.", 5000)
+            size = os.path.getsize(path)
         except OSError as exc:
             QtWidgets.QMessageBox.warning(self, "Open failed", str(exc))
             return
+        self._pending_loads.add(path)
+        task = _LoadTask(path, delimiter, self._load_signals)
+        if size < _ASYNC_LOAD_BYTES:
+            task.run()
+            return
+        self._status_bar.showMessage(f"Loading {os.path.basename(path)}...")
+        QtCore.QThreadPool.globalInstance().start(task)
+
+    def _reuse_pooled_editor(self, path: str) -> bool:
+        pooled = self._editor_pool.pop(path, None)
+        if pooled is None:
+            return False
+        editor, mtime = pooled
+        try:
+            unchanged = os.path.getmtime(path) == mtime
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            editor.deleteLater()
+            return False
+        self._open_documents[path] = editor
+        self._show_tab(editor)
+        self._persist_session_state()
+        self._watch_file(path)
+        return True
+
+    def _pool_closed_editor(self, path: str, editor: EditorWidget) -> None:
+        mtime = self._file_mtimes.get(path)
+        if editor.is_dirty() or mtime is None:
+            editor.deleteLater()
+            return
+        stale = self._editor_pool.pop(path, None)
+        if stale is not None:
+            stale[0].deleteLater()
+        self._editor_pool[path] = (editor, mtime)
+        if len(self._editor_pool) > _EDITOR_POOL_SIZE:
+            _, (evicted, _) = self._editor_pool.popitem(last=False)
+            evicted.deleteLater()
+
+    def _on_document_loaded(self, path: str, document: CsvDocument) -> None:
+        self._pending_loads.discard(path)
+        if path in self._open_documents:
+            return
+        self._add_editor(path, EditorWidget(document, self))
 
+    def _on_document_parse_failed(self, path: str, raw_text: str, error: str) -> None:
+        self._pending_loads.discard(path)
+        if path in self._open_documents:
+            return
+        delimiter = _delimiter_for_path(path)
+        document = CsvDocument(path, delimiter, [], [])
+        editor = EditorWidget(document, self, raw_text=raw_text, parse_error=error)
+        self._add_editor(path, editor)
+        self._status_bar.showMessage("CSV parse error. Check the Code view.", 5000)
+
+    def _on_document_load_failed(self, path: str, message: str) -> None:
+        self._pending_loads.discard(path)
+        self._status_bar.clearMessage()
+        QtWidgets.QMessageBox.warning(self, "Open failed", message)
+
+    def _add_editor(self, path: str, editor: EditorWidget) -> None:
         editor.document_changed.connect(self._on_document_changed)
+        editor.dirty_changed.connect(lambda dirty, ed=editor: self._on_dirty_changed(ed, dirty))
         editor.cell_selected.connect(
             lambda row, col, value, ed=editor: self._cell_panel.update_cell(ed, row, col, value)
         )
         editor.table_state_changed.connect(lambda ed=editor: self._persist_table_state(ed))
+        editor.set_undo_limit(self._undo_limit)
         self._open_documents[path] = editor
 
         self._restore_table_state(editor)
         self._show_tab(editor)
         self._persist_session_state()
         editor._table_view.selectionModel().selectionChanged.connect(
-            lambda *_: self._update_status(editor)
+            lambda *_: self._on_editor_selection_changed(editor)
         )
+        model = editor._table_view.model()
+        for signal in (
+            model.rowsInserted,
+            model.rowsRemoved,
+            model.columnsInserted,
+            model.columnsRemoved,
+            model.modelReset,
+            model.layoutChanged,
+        ):
+            signal.connect(lambda *_, ed=editor: self._selected_cell_counts.pop(ed, None))
         self._watch_file(path)
 
     def _build_actions(self) -> None:
@@ -405,17 +610,7 @@ class MainWindow(QtWidgets.QMainWindow):
         return None
 
     def _load_document(self, path: str, delimiter: str) -> CsvDocument:
-        with open(path, "r", encoding="utf-8", newline="") as handle:
-            reader = csv.reader(handle, delimiter=delimiter)
-            rows = list(reader)
-        if not rows:
-            return CsvDocument(path, delimiter, [], [])
-        header = rows[0]
-        expected_cols = len(header)
-        for idx, row in enumerate(rows[1:], start=2):
-            if len(row) != expected_cols:
-                raise ValueError(f"Line {idx} has {len(row)} columns, expected {expected_cols}.")
-        return CsvDocument(path, delimiter, header, rows[1:])
+        return _load_csv_document(path, delimiter)
 
     def new_file(self) -> None:
         path, _ = QtWidgets.QFileDialog.getSaveFileName(
@@ -426,15 +621,13 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         if not path:
             return
-        if not path.lower().endswith((".csv", ".tsv")):
+        if not _is_table_path(path):
             path += ".csv"
-        delimiter = "\t" if path.lower().endswith(".tsv") else ","
+        delimiter = _delimiter_for_path(path)
         document = CsvDocument(path, delimiter, ["column1"], [])
-        editor = EditorWidget(document, self)
-        editor.document_changed.connect(self._on_document_changed)
-        self._open_documents[path] = editor
-        self._show_tab(editor)
+        self._add_editor(path, EditorWidget(document, self))
         self.save_current()
+        # The file only exists after the first save, so watch it again now.
         self._watch_file(path)
 
     def open_file_dialog(self) -> None:
@@ -533,16 +726,9 @@ class MainWindow(QtWidgets.QMainWindow):
     def open_terminal_here(self) -> None:
         if not self._root_path:
             return
-        quoted = shlex.quote(self._root_path)
-        script = (
-            'tell application "Terminal"\n'
-            "activate\n"
-            f'do script "cd {quoted}"\n'
-            "end tell"
-        )
         try:
-            subprocess.run(["osascript", "-e", script], check=True)
-        except (OSError, subprocess.CalledProcessError) as exc:
+            subprocess.Popen(["open", "-a", "Terminal", self._root_path], close_fds=True)
+        except OSError as exc:
             QtWidgets.QMessageBox.warning(self, "Terminal failed", str(exc))
 
     def _add_plugin_scripts(self) -> None:
@@ -554,12 +740,8 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         if not paths:
             return
-        current = {path for path in self._plugin_scripts if isinstance(path, str)}
-        for path in paths:
-            if path not in current:
-                current.add(path)
-        self._plugin_scripts = sorted(current)
-        self._settings.setValue("plugin_scripts", self._plugin_scripts)
+        self._plugin_scripts.update(paths)
+        self._settings.setValue("plugin_scripts", sorted(self._plugin_scripts))
         self._rebuild_plugin_menu()
 
     def _rebuild_plugin_menu(self) -> None:
@@ -570,9 +752,7 @@ class MainWindow(QtWidgets.QMainWindow):
         for action in actions:
             if action not in keep:
                 self._plugin_menu.removeAction(action)
-        for path in self._plugin_scripts:
-            if not isinstance(path, str):
-                continue
+        for path in sorted(self._plugin_scripts, key=str.lower):
             label = os.path.splitext(os.path.basename(path))[0] or path
             action = QtGui.QAction(label, self)
             action.setToolTip(path)
@@ -583,11 +763,126 @@ class MainWindow(QtWidgets.QMainWindow):
         if not os.path.exists(path):
             QtWidgets.QMessageBox.warning(self, "Plugin failed", f"Script not found:\n{path}")
             return
+        if hasattr(os, "fork") and self._plugin_worker_job is None:
+            self._submit_plugin_job(path)
+            return
+        self._run_plugin_script_standalone(path)
+
+    def _plugin_python(self) -> str:
+        return shutil.which("python3") or sys.executable
+
+    def _plugin_environment(self) -> dict[str, str]:
+        try:
+            return {"RUSSELL_QSS_CACHE_PATH": stylesheet_cache_path(self._theme_name)}
+        except OSError:
+            return {}
+
+    def _ensure_plugin_worker(self) -> QtCore.QProcess:
+        worker = self._plugin_worker
+        if worker is not None and worker.state() != QtCore.QProcess.ProcessState.NotRunning:
+            return worker
+        worker = QtCore.QProcess(self)
+        worker_script = os.path.join(os.path.dirname(os.path.dirname(__file__)), "plugin_worker.py")
+        worker.setProgram(self._plugin_python())
+        worker.setArguments(["-u", worker_script])
+        worker.setProcessChannelMode(QtCore.QProcess.ProcessChannelMode.SeparateChannels)
+        worker.readyReadStandardOutput.connect(self._on_plugin_worker_output)
+        worker.finished.connect(lambda *_: self._on_plugin_worker_stopped(worker))
+        worker.errorOccurred.connect(lambda *_: self._on_plugin_worker_stopped(worker))
+        self._plugin_worker = worker
+        self._plugin_worker_buffer = b""
+        worker.start()
+        return worker
+
+    def _submit_plugin_job(self, path: str) -> None:
+        worker = self._ensure_plugin_worker()
+        self._plugin_job_counter += 1
+        self._plugin_worker_job = self._plugin_job_counter
+        job = {
+            "id": self._plugin_worker_job,
+            "script": path,
+            "cwd": self._root_path,
+            "env": self._plugin_environment(),
+        }
+        worker.write((json.dumps(job) + "\n").encode("utf-8"))
+
+    def _on_plugin_worker_output(self) -> None:
+        worker = self._plugin_worker
+        if worker is None:
+            return
+        self._plugin_worker_buffer += bytes(worker.readAllStandardOutput())
+        while b"\n" in self._plugin_worker_buffer:
+            line, self._plugin_worker_buffer = self._plugin_worker_buffer.split(b"\n", 1)
+            try:
+                result = json.loads(line.decode("utf-8", errors="replace"))
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(result, dict) or result.get("id") != self._plugin_worker_job:
+                continue
+            self._plugin_worker_job = None
+            exit_code = result.get("exit_code", 1)
+            self._report_plugin_result(
+                exit_code == 0,
+                str(result.get("stdout", "")).strip(),
+                str(result.get("stderr", "")).strip(),
+            )
+
+    def _on_plugin_worker_stopped(self, worker: QtCore.QProcess) -> None:
+        # errorOccurred also reports non-fatal errors and usually precedes
+        # finished, so only the first signal after the process exits counts.
+        if worker is not self._plugin_worker or worker.state() != QtCore.QProcess.ProcessState.NotRunning:
+            return
+        self._plugin_worker = None
+        worker.readyReadStandardOutput.disconnect()
+        worker.finished.disconnect()
+        worker.errorOccurred.disconnect()
+        if self._plugin_worker_job is not None:
+            self._plugin_worker_job = None
+            details = bytes(worker.readAllStandardError()).decode("utf-8", errors="replace")
+            self._report_plugin_result(False, "", details.strip())
+        worker.deleteLater()
+
+    def _stop_plugin_worker(self) -> None:
+        worker = self._plugin_worker
+        if worker is None:
+            return
+        self._plugin_worker_job = None
+        worker.closeWriteChannel()
+        if worker.waitForFinished(1000):
+            return
+        worker.terminate()
+        if not worker.waitForFinished(1000):
+            worker.kill()
+            worker.waitForFinished(1000)
+
+    def _report_plugin_result(self, succeeded: bool, stdout_text: str, stderr_text: str) -> None:
+        if not succeeded:
+            message = "Script failed."
+            details = stderr_text or stdout_text
+            if details:
+                message = f"{message}\n\n{details}"
+            QtWidgets.QMessageBox.warning(self, "Plugin failed", message)
+        elif stderr_text:
+            message = "Script finished with warnings."
+            message = f"{message}\n\n{stderr_text}"
+            if stdout_text:
+                message = f"{message}\n\n{stdout_text}"
+            QtWidgets.QMessageBox.warning(self, "Plugin warnings", message)
+        else:
+            message = "Script finished successfully."
+            if stdout_text:
+                message = f"{message}\n\n{stdout_text}"
+            QtWidgets.QMessageBox.information(self, "Plugin finished", message)
+
+    def _run_plugin_script_standalone(self, path: str) -> None:
         process = QtCore.QProcess(self)
-        python_exe = shutil.which("python3") or sys.executable
-        process.setProgram(python_exe)
+        process.setProgram(self._plugin_python())
         process.setArguments([path])
         process.setWorkingDirectory(self._root_path)
+        environment = QtCore.QProcessEnvironment.systemEnvironment()
+        for key, value in self._plugin_environment().items():
+            environment.insert(key, value)
+        process.setProcessEnvironment(environment)
         process.setProcessChannelMode(QtCore.QProcess.ProcessChannelMode.SeparateChannels)
         self._plugin_processes.append(process)
 
@@ -604,23 +899,8 @@ class MainWindow(QtWidgets.QMainWindow):
         def _on_finished(exit_code: int, exit_status: QtCore.QProcess.ExitStatus) -> None:
             stdout_text = _read_text(process.readAllStandardOutput())
             stderr_text = _read_text(process.readAllStandardError())
-            if exit_status != QtCore.QProcess.ExitStatus.NormalExit or exit_code != 0:
-                message = "Script failed."
-                details = stderr_text or stdout_text
-                if details:
-                    message = f"{message}\n\n{details}"
-                QtWidgets.QMessageBox.warning(self, "Plugin failed", message)
-            elif stderr_text:
-                message = "Script finished with warnings."
-                message = f"{message}\n\n{stderr_text}"
-                if stdout_text:
-                    message = f"{message}\n\n{stdout_text}"
-                QtWidgets.QMessageBox.warning(self, "Plugin warnings", message)
-            else:
-                message = "Script finished successfully."
-                if stdout_text:
-                    message = f"{message}\n\n{stdout_text}"
-                QtWidgets.QMessageBox.information(self, "Plugin finished", message)
+            succeeded = exit_status == QtCore.QProcess.ExitStatus.NormalExit and exit_code == 0
+            self._report_plugin_result(succeeded, stdout_text, stderr_text)
             _cleanup()
 
         def _on_error(_: QtCore.QProcess.ProcessError) -> None:
@@ -668,10 +948,9 @@ class MainWindow(QtWidgets.QMainWindow):
             self._save_editor(editor, path, update_path=False)
 
     def save_all(self) -> None:
-        for editor in list(self._open_documents.values()):
-            if editor.is_dirty():
-                if not self._save_editor(editor, editor.document.path, update_path=False):
-                    return
+        for editor in self._dirty_editors_in_tab_order():
+            if not self._save_editor(editor, editor.document.path, update_path=False):
+                return
         self._status_bar.showMessage("Saved all open files")
 
     def rename_current(self) -> None:
@@ -680,7 +959,7 @@ class MainWindow(QtWidgets.QMainWindow):
             return
         current_path = editor.document.path
         directory = os.path.dirname(current_path)
-        base = os.path.basename(current_path)
+        base = editor.document.basename
         new_name, ok = QtWidgets.QInputDialog.getText(
             self, "Rename File", "New file name:", text=base
         )
@@ -698,14 +977,14 @@ class MainWindow(QtWidgets.QMainWindow):
         if current_path in self._file_comments:
             self._file_comments[new_path] = self._file_comments.pop(current_path)
             self._persist_file_comments()
-        editor.document.path = new_path
+        editor.document.set_path(new_path)
         self._open_documents.pop(current_path, None)
         self._open_documents[new_path] = editor
         self._update_window_title(editor)
         self._update_list_item_path(current_path, new_path)
         self._unwatch_file(current_path)
         self._watch_file(new_path)
-        self._status_bar.showMessage(f"Renamed to: {os.path.basename(new_path)}")
+        self._status_bar.showMessage(f"Renamed to: {editor.document.basename}")
 
     def close_current_tab(self) -> None:
         index = self._tabs.currentIndex()
@@ -722,8 +1001,15 @@ class MainWindow(QtWidgets.QMainWindow):
                 return
         path = editor.document.path
         self._open_documents.pop(path, None)
+        self._dirty_editors.discard(editor)
+        self._selected_cell_counts.pop(editor, None)
+        if self._status_editor is editor:
+            self._status_editor = None
+        if self._title_editor is editor:
+            self._title_editor = None
         self._tabs.removeTab(index)
-        editor.deleteLater()
+        # Clean editors are kept for a quick reopen; discarded edits are never reused.
+        self._pool_closed_editor(path, editor)
         self._unwatch_file(path)
         if self._tabs.count() == 0:
             self._current_path = None
@@ -745,55 +1031,99 @@ class MainWindow(QtWidgets.QMainWindow):
         editor = self._open_documents.get(path)
         if editor:
             self._update_status(editor)
-            self._update_window_title(editor)
+            # Bursts of edits (paste, replace all, undo storms) share one title update.
+            self._title_editor = editor
+            if not self._title_timer.isActive():
+                self._title_timer.start()
         if self._auto_save_enabled and not self._auto_save_in_progress:
             self._schedule_auto_save()
 
+    def _refresh_title(self) -> None:
+        editor = self._title_editor
+        self._title_editor = None
+        if editor is not None:
+            self._update_window_title(editor)
+
+    def _on_dirty_changed(self, editor: EditorWidget, dirty: bool) -> None:
+        if dirty:
+            self._dirty_editors.add(editor)
+        else:
+            self._dirty_editors.discard(editor)
+
+    def _on_editor_selection_changed(self, editor: EditorWidget) -> None:
+        self._selected_cell_counts.pop(editor, None)
+        self._update_status(editor)
+
     def _update_status(self, editor: EditorWidget) -> None:
+        self._status_editor = editor
+        self._status_message_before_update = self._status_bar.currentMessage()
+        self._status_timer.start()
+
+    def _refresh_status(self) -> None:
+        editor = self._status_editor
+        self._status_editor = None
+        if editor is None or not self._status_bar.isVisible():
+            return
+        # A message shown after the update was requested wins, as it would have
+        # if the status had been refreshed synchronously.
+        if self._status_bar.currentMessage() != self._status_message_before_update:
+            return
         doc = editor.document
         rows = len(doc.rows)
         cols = len(doc.header)
-        selection = editor._table_view.selectionModel().selection()
-        selected_cells = sum(
-            (range_.right() - range_.left() + 1) * (range_.bottom() - range_.top() + 1)
-            for range_ in selection
-        )
+        # Cell edits do not change the selection, so the count is reused until the
+        # selection or the table shape changes.
+        selected_cells = self._selected_cell_counts.get(editor)
+        if selected_cells is None:
+            selection = editor._table_view.selectionModel().selection()
+            selected_cells = sum(
+                map(
+                    operator.mul,
+                    map(QtCore.QItemSelectionRange.width, selection),
+                    map(QtCore.QItemSelectionRange.height, selection),
+                )
+            )
+            self._selected_cell_counts[editor] = selected_cells
         self._status_bar.showMessage(
             f"UTF-8 | Rows: {rows} | Cols: {cols} | Selected: {selected_cells}"
         )
 
     def _update_window_title(self, editor: Optional[EditorWidget]) -> None:
         if not editor:
-            self.setWindowTitle("RussellCsv")
+            if self.windowTitle() != "RussellCsv":
+                self.setWindowTitle("RussellCsv")
             return
-        name = os.path.basename(editor.document.path)
-        if editor.is_dirty():
-            name = f"*{name}"
-        self.setWindowTitle(f"{name} - RussellCsv")
-        self._update_tab_label(editor)
+        label = self._tab_label(editor)
+        title = f"{label} - RussellCsv"
+        if self.windowTitle() != title:
+            self.setWindowTitle(title)
+        self._update_tab_label(editor, label)
 
-    def _update_tab_label(self, editor: EditorWidget) -> None:
+    def _tab_label(self, editor: EditorWidget) -> str:
+        basename = editor.document.basename
+        return f"*{basename}" if editor.is_dirty() else basename
+
+    def _update_tab_label(self, editor: EditorWidget, label: Optional[str] = None) -> None:
         index = self._tab_index_for_editor(editor)
         if index == -1:
             return
-        label = os.path.basename(editor.document.path)
-        if editor.is_dirty():
-            label = f"*{label}"
-        self._tabs.setTabText(index, label)
+        if label is None:
+            label = self._tab_label(editor)
+        if self._tabs.tabText(index) != label:
+            self._tabs.setTabText(index, label)
 
     def _tab_index_for_editor(self, editor: EditorWidget) -> int:
-        for idx in range(self._tabs.count()):
-            if self._tabs.widget(idx) is editor:
-                return idx
-        return -1
+        return self._tabs.indexOf(editor)
+
+    def _dirty_editors_in_tab_order(self) -> list[EditorWidget]:
+        # The dirty set has no stable order; saves and prompts follow the tabs.
+        editors = (self._tabs.widget(index) for index in range(self._tabs.count()))
+        return [editor for editor in editors if editor in self._dirty_editors]
 
     def _show_tab(self, editor: EditorWidget) -> None:
         index = self._tab_index_for_editor(editor)
         if index == -1:
-            label = os.path.basename(editor.document.path)
-            if editor.is_dirty():
-                label = f"*{label}"
-            index = self._tabs.addTab(editor, label)
+            index = self._tabs.addTab(editor, self._tab_label(editor))
         self._tabs.setCurrentIndex(index)
         self._activate_editor(editor)
 
@@ -823,7 +1153,7 @@ class MainWindow(QtWidgets.QMainWindow):
         result = QtWidgets.QMessageBox.question(
             self,
             "Unsaved Changes",
-            f"Save changes to {os.path.basename(editor.document.path)}?",
+            f"Save changes to {editor.document.basename}?",
             QtWidgets.QMessageBox.StandardButton.Save
             | QtWidgets.QMessageBox.StandardButton.Discard
             | QtWidgets.QMessageBox.StandardButton.Cancel,
@@ -838,19 +1168,15 @@ class MainWindow(QtWidgets.QMainWindow):
         if not editor.sync_from_code_view():
             return False
         doc = editor.document
-        delimiter = "\t" if path.lower().endswith(".tsv") else ","
-        if not path.lower().endswith((".csv", ".tsv")):
+        delimiter = _delimiter_for_path(path)
+        if not _is_table_path(path):
             path += ".csv"
             delimiter = ","
         try:
-            with open(path, "w", encoding="utf-8", newline="") as handle:
-                writer = csv.writer(handle, delimiter=delimiter)
-                if doc.header:
-                    writer.writerow(doc.header)
-                writer.writerows(doc.rows)
+            _write_text_atomic(path, serialize_csv_document(doc, delimiter))
             if update_path:
                 old_path = doc.path
-                doc.path = path
+                doc.set_path(path)
                 doc.delimiter = delimiter
                 self._open_documents.pop(old_path, None)
                 self._open_documents[path] = editor
@@ -871,13 +1197,13 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:
         self._auto_save_all()
-        for editor in list(self._open_documents.values()):
-            if editor.is_dirty():
-                if not self._confirm_discard(editor):
-                    event.ignore()
-                    return
+        for editor in self._dirty_editors_in_tab_order():
+            if not self._confirm_discard(editor):
+                event.ignore()
+                return
         self._persist_all_table_states()
-        self._persist_session_state()
+        self._write_session_state()
+        self._stop_plugin_worker()
         event.accept()
 
     def leaveEvent(self, event: QtCore.QEvent) -> None:
@@ -887,55 +1213,145 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def _populate_file_list(self, root_path: str) -> None:
         self._file_list.clear()
-        entries: list[tuple[str, str]] = []
-        for root, _, files in os.walk(root_path):
-            for name in files:
-                _, ext = os.path.splitext(name)
-                if ext.lower() in {".csv", ".tsv"}:
-                    full_path = os.path.join(root, name)
-                    entries.append((name, full_path))
-        for name, full_path in sorted(entries, key=lambda item: item[0].lower()):
+        self._file_list_lowercase = []
+        self._file_list_paths = []
+        self._file_list_visible_rows = None
+        self._path_to_list_item = {}
+        self._file_filter_text = ""
+        entries: list[tuple[str, str, str]] = []
+        for full_path in self._scan_table_files(root_path):
+            name = os.path.basename(full_path)
+            entries.append((name.lower(), name, full_path))
+        entries.sort()
+        user_role = _USER_ROLE
+        for lower_name, name, full_path in entries:
             item = QtWidgets.QListWidgetItem(name)
-            item.setData(QtCore.Qt.ItemDataRole.UserRole, full_path)
+            item.setData(user_role, full_path)
             item.setToolTip(self._item_tooltip(full_path))
             self._file_list.addItem(item)
+            self._file_list_lowercase.append(lower_name)
+            self._file_list_paths.append(full_path)
+            self._path_to_list_item[full_path] = item
+
+    def _scan_table_files(self, root_path: str) -> list[str]:
+        # Directory mtimes change whenever entries are added, removed or renamed, so
+        # only directories that changed since the last scan are listed again.
+        paths: list[str] = []
+        pending = [root_path]
+        previous_cache = self._dir_scan_cache
+        # Rebuilt from the directories visited this scan so removed ones drop out.
+        self._dir_scan_cache = {}
+        now_ns = time.time_ns()
+        while pending:
+            directory = pending.pop()
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            cached = previous_cache.get(directory)
+            if cached is None or cached[0] != mtime:
+                subdirs, tables = self._scan_directory(directory)
+                cached = (mtime, subdirs, tables)
+            # A change within the same timestamp tick would keep the mtime, so a
+            # listing is only trusted once its mtime is safely in the past.
+            if now_ns - mtime > _DIR_MTIME_SLACK_NS:
+                self._dir_scan_cache[directory] = cached
+            paths.extend(cached[2])
+            pending.extend(cached[1])
+        return paths
+
+    def _scan_directory(self, directory: str) -> tuple[list[str], list[str]]:
+        subdirs: list[str] = []
+        tables: list[str] = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # Checks without following symlinks come from the cached d_type, so
+                    # only symlinks with a table suffix cost a stat call.
+                    name = entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not name.startswith(".") and name not in _SKIP_SCAN_DIRS:
+                                subdirs.append(entry.path)
+                            continue
+                        if not name.lower().endswith(_TABLE_SUFFIXES):
+                            continue
+                        if entry.is_symlink() and entry.is_dir():
+                            continue
+                    except OSError:
+                        continue
+                    tables.append(entry.path)
+        except OSError:
+            pass
+        return subdirs, tables
 
     def _filter_file_list(self, text: str) -> None:
         text = text.strip().lower()
-        for i in range(self._file_list.count()):
-            item = self._file_list.item(i)
-            name = item.text().lower()
-            path = item.data(QtCore.Qt.ItemDataRole.UserRole)
-            comment = ""
-            if isinstance(path, str):
-                comment = self._file_comments.get(path, "").lower()
-            match = text in name or (comment and text in comment)
-            item.setHidden(bool(text) and not match)
+        previous = self._file_filter_text
+        self._file_filter_text = text
+        # Typing more characters can only hide items, so only visible rows need a re-test.
+        narrowing = bool(previous) and text.startswith(previous)
+        if narrowing and self._file_list_visible_rows is not None:
+            rows: Iterable[int] = self._file_list_visible_rows
+        else:
+            rows = range(len(self._file_list_lowercase))
+        names = self._file_list_lowercase
+        paths = self._file_list_paths
+        comments = self._file_comments_lowercase
+        visible: list[int] = []
+        self._file_list.setUpdatesEnabled(False)
+        try:
+            for i in rows:
+                item = self._file_list.item(i)
+                should_hide = bool(text) and not (
+                    text in names[i] or text in comments.get(paths[i], "")
+                )
+                if should_hide != item.isHidden():
+                    item.setHidden(should_hide)
+                if not should_hide:
+                    visible.append(i)
+        finally:
+            self._file_list.setUpdatesEnabled(True)
+        self._file_list_visible_rows = visible if text else None
 
     def _select_path(self, path: str) -> None:
-        for i in range(self._file_list.count()):
-            item = self._file_list.item(i)
-            item_path = item.data(QtCore.Qt.ItemDataRole.UserRole)
-            if item_path == path:
-                self._file_list.setCurrentItem(item)
-                return
+        item = self._path_to_list_item.get(path)
+        if item is not None:
+            self._file_list.setCurrentItem(item)
 
     def _update_list_item_path(self, old_path: str, new_path: str) -> None:
-        for i in range(self._file_list.count()):
-            item = self._file_list.item(i)
-            item_path = item.data(QtCore.Qt.ItemDataRole.UserRole)
-            if item_path == old_path:
-                item.setText(os.path.basename(new_path))
-                item.setData(QtCore.Qt.ItemDataRole.UserRole, new_path)
-                item.setToolTip(self._item_tooltip(new_path))
-                return
+        item = self._path_to_list_item.pop(old_path, None)
+        if item is None:
+            return
+        item.setText(os.path.basename(new_path))
+        row = self._file_list.row(item)
+        self._file_list_lowercase[row] = item.text().lower()
+        self._file_list_paths[row] = new_path
+        item.setData(_USER_ROLE, new_path)
+        item.setToolTip(self._item_tooltip(new_path))
+        self._path_to_list_item[new_path] = item
+        text = self._search_input.text().strip().lower()
+        if text:
+            item.setHidden(
+                not (
+                    text in self._file_list_lowercase[row]
+                    or text in self._file_comments_lowercase.get(new_path, "")
+                )
+            )
+            # The cached visible rows may no longer match, so rescan every row next time.
+            self._file_filter_text = ""
 
     def _persist_session_state(self) -> None:
+        self._session_state_timer.start()
+
+    def _write_session_state(self) -> None:
+        self._session_state_timer.stop()
         self._settings.setValue("last_root_path", self._root_path)
         self._settings.setValue("last_open_files", list(self._open_documents.keys()))
         self._settings.setValue("last_current_file", self._current_path or "")
         self._settings.setValue("last_selected_files", self._selected_paths())
         self._persist_all_table_states()
+        self._settings.sync()
 
     def _table_state_key(self, path: str) -> str:
         return f"table_state::{path}"
@@ -993,10 +1409,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self._auto_save_in_progress = True
         saved = 0
         try:
-            for editor in list(self._open_documents.values()):
-                if editor.is_dirty():
-                    if self._save_editor(editor, editor.document.path, update_path=False):
-                        saved += 1
+            for editor in self._dirty_editors_in_tab_order():
+                if self._save_editor(editor, editor.document.path, update_path=False):
+                    saved += 1
         finally:
             self._auto_save_in_progress = False
         if saved:
@@ -1016,25 +1431,24 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def _selected_paths(self) -> list[str]:
         paths: list[str] = []
+        user_role = _USER_ROLE
         for item in self._file_list.selectedItems():
-            path = item.data(QtCore.Qt.ItemDataRole.UserRole)
+            path = item.data(user_role)
             if isinstance(path, str):
                 paths.append(path)
         return paths
 
     def _select_paths(self, paths: list[str]) -> None:
-        target = set(paths)
-        for i in range(self._file_list.count()):
-            item = self._file_list.item(i)
-            path = item.data(QtCore.Qt.ItemDataRole.UserRole)
-            if path in target:
+        for path in paths:
+            item = self._path_to_list_item.get(path)
+            if item is not None:
                 item.setSelected(True)
 
     def _show_file_list_menu(self, position: QtCore.QPoint) -> None:
         item = self._file_list.itemAt(position)
         if not item:
             return
-        path = item.data(QtCore.Qt.ItemDataRole.UserRole)
+        path = item.data(_USER_ROLE)
         if not isinstance(path, str):
             return
         menu = QtWidgets.QMenu(self)
@@ -1076,7 +1490,11 @@ class MainWindow(QtWidgets.QMainWindow):
         return {str(key): str(value) for key, value in raw.items() if value is not None}
 
     def _persist_file_comments(self) -> None:
+        self._file_comments_lowercase = {
+            path: comment.lower() for path, comment in self._file_comments.items()
+        }
         self._settings.setValue("file_comments", self._file_comments)
+        self._file_filter_text = ""
 
     def _watch_file(self, path: str) -> None:
         if not path:
@@ -1109,6 +1527,9 @@ class MainWindow(QtWidgets.QMainWindow):
             self._status_bar.showMessage(f"File removed: {os.path.basename(path)}", 5000)
             self._unwatch_file(path)
             return
+        # Atomic saves replace the file, which drops it from the watcher.
+        if path in self._open_documents and path not in self._file_watcher.files():
+            self._file_watcher.addPath(path)
         timer = self._file_change_timers.get(path)
         if timer is None:
             timer = QtCore.QTimer(self)
@@ -1131,12 +1552,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self._file_mtimes[path] = mtime
         if not editor:
             return
+        name = editor.document.basename
         if editor.is_dirty():
             self._status_bar.showMessage(
-                f"File changed on disk (unsaved edits): {os.path.basename(path)}", 6000
+                f"File changed on disk (unsaved edits): {name}", 6000
             )
             return
-        delimiter = "\t" if path.lower().endswith(".tsv") else ","
+        delimiter = _delimiter_for_path(path)
         try:
             document = self._load_document(path, delimiter)
         except ValueError as exc:
@@ -1145,25 +1567,25 @@ class MainWindow(QtWidgets.QMainWindow):
                     raw_text = handle.read()
             except OSError as read_exc:
                 self._status_bar.showMessage(
-                    f"Reload failed: {os.path.basename(path)} ({read_exc})", 6000
+                    f"Reload failed: {name} ({read_exc})", 6000
                 )
                 return
             editor.show_parse_error(raw_text, str(exc))
             self._update_window_title(editor)
             self._status_bar.showMessage(
-                f"Reloaded with conflicts: {os.path.basename(path)}", 6000
+                f"Reloaded with conflicts: {name}", 6000
             )
             return
         except OSError as exc:
             self._status_bar.showMessage(
-                f"Reload failed: {os.path.basename(path)} ({exc})", 6000
+                f"Reload failed: {name} ({exc})", 6000
             )
             return
         editor.set_document(document)
         editor.set_dirty(False)
         self._update_status(editor)
         self._update_window_title(editor)
-        self._status_bar.showMessage(f"Reloaded: {os.path.basename(path)}", 4000)
+        self._status_bar.showMessage(f"Reloaded: {name}", 4000)
 
     def _configure_safe_mode_timer(self) -> None:
         interval = self._settings.value("safe_mode_interval_min", 5, type=int)
@@ -1395,18 +1817,20 @@ class MainWindow(QtWidgets.QMainWindow):
     def _relation_tables(self) -> list[str]:
         if not self._root_path:
             return []
+        paths = tuple(self._scan_table_files(self._root_path))
+        cached = self._relation_tables_cache
+        if cached is not None and cached[0] == self._root_path and cached[1] == paths:
+            return list(cached[2])
         tables: list[str] = []
-        for root, _, files in os.walk(self._root_path):
-            for name in files:
-                _, ext = os.path.splitext(name)
-                if ext.lower() in {".csv", ".tsv"}:
-                    full = os.path.join(root, name)
-                    try:
-                        rel = os.path.relpath(full, self._root_path)
-                    except ValueError:
-                        rel = name
-                    tables.append(rel)
-        return sorted(set(tables))
+        for full in paths:
+            try:
+                rel = os.path.relpath(full, self._root_path)
+            except ValueError:
+                rel = os.path.basename(full)
+            tables.append(rel)
+        result = sorted(set(tables))
+        self._relation_tables_cache = (self._root_path, paths, result)
+        return list(result)
 
     def _relation_current_fields(self) -> list[str]:
         path = self._current_path
@@ -1424,25 +1848,33 @@ class MainWindow(QtWidgets.QMainWindow):
         return self._read_csv_header(path)
 
     def _read_csv_header(self, path: str) -> list[str]:
-        if not os.path.exists(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
             return []
-        delimiter = "\t" if path.lower().endswith(".tsv") else ","
+        setting = self._relation_header_setting()
+        key = (stat.st_mtime_ns, stat.st_size, setting)
+        cached = self._csv_header_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return list(cached[1])
+        delimiter = _delimiter_for_path(path)
         try:
             with open(path, "r", encoding="utf-8", newline="") as handle:
                 reader = csv.reader(handle, delimiter=delimiter)
-                setting = self._relation_header_setting()
                 if setting.lower() == "head":
-                    return next(reader, [])
-                try:
-                    row_index = max(1, int(setting))
-                except ValueError:
-                    return next(reader, [])
-                row = []
-                for _ in range(row_index):
                     row = next(reader, [])
-                return row
+                else:
+                    try:
+                        row_index = max(1, int(setting))
+                    except ValueError:
+                        row_index = 1
+                    row = []
+                    for _ in range(row_index):
+                        row = next(reader, [])
         except OSError:
             return []
+        self._csv_header_cache[path] = (key, row)
+        return list(row)
 
     def _relation_header_setting(self) -> str:
         value = self._settings.value("relations_header_row", "4", type=str)
@@ -0,0 +1,91 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from csv_ide import models
+from csv_ide.models import parse_csv_document, parse_csv_file, parse_csv_text
+
+
+def _reference_rows(text: str) -> list[list[str]]:
+    return list(csv.reader(io.StringIO(text, newline="")))
+
+
+class ParseLineEndingsTest(unittest.TestCase):
+    def assert_parses_like_csv_reader(self, text: str) -> None:
+        expected = _reference_rows(text)
+        document = parse_csv_text(text, "sample.csv", ",")
+        self.assertEqual(document.header, expected[0])
+        self.assertEqual(document.rows, expected[1:])
+
+    def test_cr_only_line_endings(self) -> None:
+        self.assert_parses_like_csv_reader("a,b\r1,2\r3,4\r")
+
+    def test_mixed_line_endings(self) -> None:
+        self.assert_parses_like_csv_reader("a,b\r\n1,2\r3,4\n5,6")
+
+    def test_quoted_field_with_embedded_cr(self) -> None:
+        self.assert_parses_like_csv_reader('a,b\r"x\ry",2\r\n')
+
+    def test_cr_only_file_matches_streaming_reader(self) -> None:
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as handle:
+            handle.write("a,b\r1,2\r3,4\r")
+        with open(path, "r", encoding="utf-8", newline="") as handle:
+            streamed = parse_csv_document(handle, path, ",")
+        with open(path, "r", encoding="utf-8", newline="") as handle:
+            loaded = parse_csv_file(handle, path, ",")
+        self.assertEqual(loaded.header, streamed.header)
+        self.assertEqual(loaded.rows, streamed.rows)
+
+    def test_file_blocks_split_like_csv_reader(self) -> None:
+        samples = [
+            "a,b\n1,2\n3,4",
+            "a,b\n1,2\n3,4\n",
+            'a,b\n1,2\n3,"x\ny"\n5,6\n',
+            "a,b\n1,2\r\n3,4\r5,6",
+            'a,b\n1,2\n3,"4\r\n5"\n6,7',
+        ]
+        for text in samples:
+            expected = _reference_rows(text)
+            for block_chars in (1, 2, 3, 5, 8, 64):
+                with self.subTest(text=text, block_chars=block_chars):
+                    with mock.patch.object(models, "_READ_BLOCK_CHARS", block_chars):
+                        document = parse_csv_file(io.StringIO(text, newline=""), "sample.csv", ",")
+                    self.assertEqual(document.header, expected[0])
+                    self.assertEqual(document.rows, expected[1:])
+
+    def test_column_mismatch_raises_value_error(self) -> None:
+        with self.assertRaises(ValueError):
+            parse_csv_text("a,b\r1,2,3\r", "sample.csv", ",")
+
+
+class ShareRepeatedValuesTest(unittest.TestCase):
+    def test_repeated_column_shares_equal_strings(self) -> None:
+        text = "kind,id\n" + "".join(f"{'ab'[i % 2]},{i}\n" for i in range(200))
+        with mock.patch.object(models, "_PARSE_CHUNK_ROWS", 50):
+            document = parse_csv_text(text, "sample.csv", ",")
+        kinds = {id(row[0]) for row in document.rows}
+        self.assertEqual(len(kinds), 2)
+
+    def test_column_that_stops_repeating_drops_its_table(self) -> None:
+        shared_values: dict[int, dict[str, str]] = {}
+        repeated = [[str(i % 3), str(i)] for i in range(300)]
+        models._share_repeated_values(repeated, 2, shared_values)
+        self.assertEqual(set(shared_values), {0})
+        distinct = [[f"late-{i}", str(i)] for i in range(300)]
+        models._share_repeated_values(distinct, 2, shared_values)
+        self.assertEqual(shared_values, {})
+
+    def test_column_distinct_late_in_chunk_is_not_shared(self) -> None:
+        shared_values: dict[int, dict[str, str]] = {}
+        chunk = [["early"] for _ in range(100)] + [[f"id-{i}"] for i in range(9900)]
+        models._share_repeated_values(chunk, 1, shared_values)
+        self.assertEqual(shared_values, {})
+
+
+if __name__ == "__main__":
+    unittest.main()